@@ -0,0 +1,81 @@
+import os
+import signal
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import toolkit  # noqa: E402
+
+# Plans the renames in a child process that is SIGKILLed after `kill_after` renames
+CRASHING_RUN = """
+import os, signal, sys
+sys.path.insert(0, sys.argv[1])
+import toolkit
+
+target, kill_after = sys.argv[2], int(sys.argv[3])
+real_rename, count = os.rename, 0
+
+def rename(src, dst):
+    global count
+    if count == kill_after:
+        os.kill(os.getpid(), signal.SIGKILL)
+    real_rename(src, dst)
+    count += 1
+
+os.rename = rename
+_, steps, _ = toolkit.plan_renames(target, "file-")
+toolkit.start_rename_journal(target, steps)
+toolkit.run_rename_journal(target, steps)
+"""
+
+
+class IndexerRecoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.dir = self.tmp.name
+        # a.txt -> file-001.txt needs the original file-001.txt staged out of the way first
+        for name, content in (("a.txt", "from a"), ("file-001.txt", "original one")):
+            Path(self.dir, name).write_text(content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def crash_after(self, renames):
+        proc = subprocess.run([sys.executable, "-c", CRASHING_RUN, str(ROOT), self.dir, str(renames)])
+        self.assertEqual(proc.returncode, -signal.SIGKILL)
+
+    def contents(self):
+        return {name: Path(self.dir, name).read_text()
+                for name in os.listdir(self.dir) if name != toolkit.INDEXER_JOURNAL}
+
+    def test_resume_after_kill(self):
+        self.crash_after(2)
+        steps, applied = toolkit.load_rename_journal(self.dir)
+        self.assertEqual(applied, 2)
+        toolkit.run_rename_journal(self.dir, steps, applied)
+        toolkit.finish_rename_journal(self.dir)
+        self.assertEqual(self.contents(), {"file-001.txt": "from a", "file-002.txt": "original one"})
+
+    def test_roll_back_after_kill(self):
+        self.crash_after(2)
+        steps, applied = toolkit.load_rename_journal(self.dir)
+        toolkit.run_rename_journal(self.dir, steps, applied, undo=True)
+        toolkit.finish_rename_journal(self.dir)
+        self.assertEqual(self.contents(), {"a.txt": "from a", "file-001.txt": "original one"})
+
+    def test_refuses_to_clobber(self):
+        _, steps, _ = toolkit.plan_renames(self.dir, "file-")
+        toolkit.start_rename_journal(self.dir, steps)
+        # Pretend the staging rename was never logged and run the chain from step 1
+        with self.assertRaises(FileExistsError):
+            toolkit.run_rename_journal(self.dir, steps, 1)
+        self.assertEqual(self.contents(), {"a.txt": "from a", "file-001.txt": "original one"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,11 +7,12 @@
 # A menu-driven Python toolkit for automating common manual tasks.
 #
 # Usage:
-# Run this script to access all 13 tools from one convenient, menu-driven
+# Run this script to access all 14 tools from one convenient, menu-driven
 # interface, eliminating the need to execute separate commands.
 
 import os
 import sys
+import errno
 import shutil
 import subprocess
 import csv
@@ -20,8 +21,48 @@ import string
 import socket
 import re
 import time
+import select
+import stat
+import ctypes
+import ctypes.util
+import struct
+import io
+import json
+import glob
+import gzip
+import bz2
+import lzma
+import tarfile
+import zlib
+import fcntl
+import mmap
+import math
+import heapq
+import sqlite3
+import hashlib
+import calendar
+import threading
+import queue
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from array import array
+from collections import defaultdict, deque
+from itertools import chain, compress, islice
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    try:
+        import sre_constants
+        import sre_parse
+    except ImportError:  # Private modules; without them indexed searches scan every file
+        sre_constants = sre_parse = None
+
+try:
+    import numpy as np  # Optional: vectorizes the CSV aggregation mode
+except ImportError:
+    np = None
 
 # =============================================================================
 # UTILITY FUNCTIONS CENTER (The Toolkit)
@@ -80,16 +121,622 @@ def check_root(prompt=True) -> bool:
         return False
     return True
 
+def get_cache_dir(name: str) -> Path:
+    """Returns (and creates) the toolkit's cache folder for a feature."""
+    base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    path = base / "toolkit" / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def write_file_atomic(path: Path, data: bytes):
+    """Writes a file via a temporary name so readers never see a partial file."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+# --- inotify (Linux) ---
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+class InotifyWatcher:
+    """Minimal ctypes binding to inotify that reports events for one path."""
+
+    EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+    def __init__(self, path: str, mask: int):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available on this system")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"Could not watch '{path}'")
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def read_events(self) -> list:
+        """Returns the pending (mask, name) events without blocking."""
+        events = []
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return events
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            events.append((mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
 # =============================================================================
 # FEATURE FUNCTIONS CENTER (The Tools)
 # =============================================================================
 
 # --- 1. Folder Organizer ---
+# Define file categories
+FOLDER_CATEGORIES = {
+    "images": [".jpg", ".jpeg", ".png"],
+    "documents": [".doc", ".docx", ".txt", ".pdf"],
+    "spreadsheets": [".xls", ".xlsx", ".csv"],
+    "scripts": [".sh", ".py"],
+    "archives": [".zip", ".tar", ".tar.gz", ".tar.bz2"],
+    "presentations": [".ppt", ".pptx"],
+    "audio": [".mp3"],
+    "video": [".mp4"]
+}
+
+class LogBuffer:
+    """Collects colored status lines and writes them to the terminal in batches."""
+
+    def __init__(self, enabled: bool = True, flush_every: int = 1000):
+        self.enabled = enabled
+        self.flush_every = flush_every
+        self.lines = []
+        self.lock = threading.RLock()  # Worker threads may log too
+
+    def add(self, line: str):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.lines.append(line)
+            if len(self.lines) >= self.flush_every:
+                self.flush()
+
+    def success(self, message: str):
+        self.add(f"{GREEN}[SUCCESS] {message}{NC}")
+
+    def info(self, message: str):
+        self.add(f"{YELLOW}[INFO] {message}{NC}")
+
+    def error(self, message: str):
+        # Errors go straight to stderr, but keep the stdout order intact
+        self.flush()
+        print_error(message)
+
+    def flush(self):
+        with self.lock:
+            if self.lines:
+                sys.stdout.write("\n".join(self.lines) + "\n")
+                sys.stdout.flush()
+                self.lines.clear()
+
+# (offset, signature, category) checked against the first bytes of a file
+MAGIC_SIGNATURES = [
+    (0, b"\x89PNG\r\n\x1a\n", "images"),
+    (0, b"\xff\xd8\xff", "images"),
+    (0, b"GIF87a", "images"),
+    (0, b"GIF89a", "images"),
+    (0, b"%PDF-", "documents"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "documents"),  # Legacy MS Office
+    (0, b"PK\x03\x04", "archives"),
+    (0, b"\x1f\x8b", "archives"),
+    (0, b"BZh", "archives"),
+    (0, b"\xfd7zXZ\x00", "archives"),
+    (0, b"7z\xbc\xaf\x27\x1c", "archives"),
+    (257, b"ustar", "archives"),
+    (0, b"ID3", "audio"),
+    (0, b"\xff\xfb", "audio"),
+    (4, b"ftyp", "video"),
+    (0, b"#!", "scripts"),
+]
+SNIFF_BYTES = 512
+ORGANIZER_CATEGORIES_FILE = Path.home() / ".config" / "toolkit" / "categories.json"
+
+def build_ext_map(categories: dict) -> dict:
+    """Inverts a category table into an extension -> category lookup."""
+    return {ext.lower(): category for category, exts in categories.items() for ext in exts}
+
+def load_categories(path: Path) -> dict:
+    """Loads a {category: [extensions]} table from a JSON file."""
+    with open(path, encoding="utf-8") as f:
+        table = json.load(f)
+    if not isinstance(table, dict) or not all(
+        isinstance(exts, list) and all(isinstance(e, str) and e.startswith(".") for e in exts)
+        for exts in table.values()
+    ):
+        raise ValueError("expected an object mapping category names to lists of '.ext' strings")
+    return table
+
+def sniff_category(path: str):
+    """Guesses a category from the magic bytes at the start of a file."""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    for offset, signature, category in MAGIC_SIGNATURES:
+        if head.startswith(signature, offset):
+            return category
+    return None
+
+class FileClassifier:
+    """Maps a DirEntry to a category by extension, falling back to its magic bytes."""
+
+    CACHE_TTL_DAYS = 30
+
+    def __init__(self, categories: dict, sniff: bool = False, cache_path: Path = None):
+        self.ext_map = build_ext_map(categories)
+        self.categories = set(categories)
+        self.sniff = sniff
+        self.cache_path = cache_path
+        self.cache = {}  # "dev:ino:size:mtime_ns" -> [category or "", last seen (days)]
+        self.today = int(time.time() // 86400)
+        self.files_read = 0
+        self.cache_hits = 0
+        if sniff and cache_path and cache_path.exists():
+            try:
+                self.cache = json.loads(cache_path.read_text())
+            except (OSError, ValueError):
+                self.cache = {}  # A broken cache is just rebuilt
+
+    def by_extension(self, name: str):
+        # Try the longest compound suffix first, so '.tar.gz' wins over '.gz'
+        lower = name.lower()
+        dot = lower.find(".", 1)  # A leading dot marks a hidden file, not an extension
+        while dot != -1:
+            category = self.ext_map.get(lower[dot:])
+            if category:
+                return category
+            dot = lower.find(".", dot + 1)
+        return None
+
+    def __call__(self, entry):
+        category = self.by_extension(entry.name)
+        if category or not self.sniff:
+            return category
+
+        st = entry.stat()
+        key = f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            cached[1] = self.today
+            return cached[0] or None
+
+        try:
+            category = sniff_category(entry.path)
+        except OSError:
+            return None
+        self.files_read += 1
+        if category not in self.categories:
+            category = None
+        self.cache[key] = [category or "", self.today]
+        return category
+
+    def save(self):
+        if not (self.sniff and self.cache_path):
+            return
+        cutoff = self.today - self.CACHE_TTL_DAYS
+        live = {k: v for k, v in self.cache.items() if v[1] >= cutoff}
+        try:
+            write_file_atomic(self.cache_path, json.dumps(live).encode())
+        except OSError as e:
+            print_error(f"Could not save the classifier cache: {e}")
+
+def iter_dir_files(root: str, recursive: bool = False, exclude: set = frozenset()):
+    """Yields a DirEntry for every file under root, one scandir pass per directory."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        # DirEntry caches the d_type, so these checks cost no extra stat
+                        if entry.is_file():
+                            yield entry
+                        elif recursive and entry.is_dir(follow_symlinks=False):
+                            if os.path.realpath(entry.path) not in exclude:
+                                stack.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print_error(f"Could not scan '{current}': {e}")
+
+class PathEntry:
+    """A DirEntry look-alike for one file name when no scandir listing is at hand."""
+
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        self.path = os.path.join(directory, name)
+        self._stat = None
+
+    def stat(self, follow_symlinks: bool = True):
+        if follow_symlinks:
+            if self._stat is None:
+                self._stat = os.stat(self.path)
+            return self._stat
+        return os.lstat(self.path)
+
+    def is_file(self) -> bool:
+        try:
+            return stat.S_ISREG(self.stat().st_mode)
+        except OSError:
+            return False
+
+def move_file(src: str, dst_dir: str, name: str, same_device: bool) -> str:
+    """Moves src into dst_dir, using a plain rename when both share a filesystem."""
+    target = os.path.join(dst_dir, name)
+    # rename() silently replaces an existing file, shutil.move() refuses to
+    if os.path.lexists(target):
+        raise FileExistsError(f"Destination path '{target}' already exists")
+    if same_device:
+        try:
+            os.rename(src, target)
+            return target
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    shutil.move(src, target)
+    return target
+
+def copy_file_data(src_fd: int, dst_fd: int):
+    """Copies a whole file between descriptors, preferring the kernel zero-copy paths."""
+    copied = 0
+    chunk = 1 << 30
+
+    # 1. copy_file_range (Linux 4.5+, can even reflink on CoW filesystems)
+    if hasattr(os, "copy_file_range"):
+        try:
+            while True:
+                n = os.copy_file_range(src_fd, dst_fd, chunk)
+                if n == 0:
+                    return
+                copied += n
+        except OSError as e:
+            # Older kernels refuse cross-filesystem ranges; only retry if nothing was written
+            if copied or e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+
+    # 2. sendfile (file -> file works on Linux 2.6.33+)
+    if hasattr(os, "sendfile"):
+        try:
+            while True:
+                n = os.sendfile(dst_fd, src_fd, copied, chunk)
+                if n == 0:
+                    return
+                copied += n
+        except OSError as e:
+            if copied or e.errno not in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+
+    # 3. Plain buffered copy
+    while True:
+        buf = os.read(src_fd, 1 << 20)
+        if not buf:
+            return
+        view = memoryview(buf)
+        while view:
+            view = view[os.write(dst_fd, view):]
+
+def copy_then_unlink(src: str, target: str):
+    """Moves a file across filesystems via a temporary name, then removes the source."""
+    if os.path.lexists(target):
+        raise FileExistsError(f"Destination path '{target}' already exists")
+    if os.path.islink(src):
+        shutil.move(src, target)
+        return
+    # One temporary name per task, so two copies aimed at the same target never share it
+    tmp = os.path.join(os.path.dirname(target),
+                       f".{os.path.basename(target)}.{os.getpid()}.{threading.get_ident()}.part")
+    try:
+        with open(src, "rb") as fsrc, open(tmp, "xb") as fdst:
+            copy_file_data(fsrc.fileno(), fdst.fileno())
+        shutil.copystat(src, tmp)
+        try:
+            # link() fails with EEXIST instead of replacing a file that appeared meanwhile
+            os.link(tmp, target)
+        except OSError as e:
+            if e.errno not in (errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EMLINK):
+                raise
+            # No hard links on this filesystem (FAT, some network mounts)
+            if os.path.lexists(target):
+                raise FileExistsError(f"Destination path '{target}' already exists")
+            os.rename(tmp, target)
+    finally:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+    os.unlink(src)
+
+class ByteBudget:
+    """Blocks the producer while too many bytes are being copied at once."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, size: int):
+        with self.cond:
+            # A file larger than the whole budget still runs, just on its own
+            while self.in_flight and self.in_flight + size > self.limit:
+                self.cond.wait()
+            self.in_flight += size
+
+    def release(self, size: int):
+        with self.cond:
+            self.in_flight -= size
+            self.cond.notify_all()
+
+class ParallelMover:
+    """Runs cross-device moves on a bounded thread pool and keeps aggregate stats."""
+
+    def __init__(self, workers: int = 4, max_bytes_in_flight: int = 256 << 20, log: LogBuffer = None):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.budget = ByteBudget(max_bytes_in_flight)
+        self.slots = threading.BoundedSemaphore(workers * 4)  # Caps queued tasks, not just bytes
+        self.log = log or LogBuffer(enabled=False)
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.targets = set()  # Destinations of queued moves, so two sources never race for one name
+        self.moved = 0
+        self.bytes_moved = 0
+        self.errors = []  # (name, error message)
+        self.busy_time = 0.0
+        self.started = None
+
+    def submit(self, src: str, target: str, size: int, label: str):
+        if self.started is None:
+            self.started = time.perf_counter()
+        with self.lock:
+            if target in self.targets:
+                raise FileExistsError(f"Destination path '{target}' is already being written")
+            self.targets.add(target)
+        self.slots.acquire()
+        self.budget.acquire(size)
+        future = self.pool.submit(self._move, src, target, size, label)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._forget)
+
+    def _forget(self, future):
+        with self.lock:
+            self.pending.discard(future)
+
+    def _move(self, src: str, target: str, size: int, label: str):
+        try:
+            copy_then_unlink(src, target)
+            with self.lock:
+                self.moved += 1
+                self.bytes_moved += size
+            self.log.success(f"Moved {label}")
+        except Exception as e:
+            with self.lock:
+                self.errors.append((label, str(e)))
+            self.log.error(f"Failed to move {label}: {e}")
+        finally:
+            with self.lock:
+                self.targets.discard(target)
+            self.budget.release(size)
+            self.slots.release()
+
+    def drain(self):
+        """Waits until every submitted move has finished."""
+        with self.lock:
+            pending = list(self.pending)
+        wait(pending)
+        if self.started is not None:
+            self.busy_time += time.perf_counter() - self.started
+            self.started = None
+
+    def shutdown(self):
+        self.drain()
+        self.pool.shutdown(wait=True)
+
+    def report(self):
+        """Prints the aggregate throughput and any per-file errors."""
+        if not (self.moved or self.errors):
+            return
+        mb = self.bytes_moved / (1 << 20)
+        rate = mb / max(self.busy_time, 1e-9)
+        print_info(f"Cross-device copies: {self.moved} files, {mb:.1f} MB in {self.busy_time:.2f}s ({rate:.1f} MB/s).")
+        if self.errors:
+            print_error(f"{len(self.errors)} cross-device moves failed:")
+            for name, err in self.errors[:20]:
+                print_error(f"  {name}: {err}")
+            if len(self.errors) > 20:
+                print_info(f"  ... and {len(self.errors) - 20} more.")
+
+def organize_files(entries, src_root: str, dest_path: Path, classify, log: LogBuffer, special_log,
+                   mover: ParallelMover = None) -> dict:
+    """Files every entry into its category folder and returns the run statistics."""
+    stats = {"moved": 0, "logged": 0, "failed": 0}
+    if mover:
+        moved_before, failed_before = mover.moved, len(mover.errors)
+    dest_dev = os.stat(dest_path).st_dev
+    category_dirs = {}  # category -> folder path, created once per run
+    parent_devs = {}    # source folder -> same filesystem as destination?
+
+    for entry in entries:
+        category = classify(entry)
+        rel_name = os.path.relpath(entry.path, src_root)
+
+        if not category:
+            special_log.write(f"{rel_name}\n")
+            log.info(f"Logged '{rel_name}' to specialFiles.list")
+            stats["logged"] += 1
+            continue
+
+        sub_dir = category_dirs.get(category)
+        if sub_dir is None:
+            sub_dir = str(dest_path / category)
+            os.makedirs(sub_dir, exist_ok=True)
+            category_dirs[category] = sub_dir
+
+        parent = os.path.dirname(entry.path)
+        same_device = parent_devs.get(parent)
+        if same_device is None:
+            same_device = os.stat(parent).st_dev == dest_dev
+            parent_devs[parent] = same_device
+
+        try:
+            if mover and not same_device:
+                # Cross-device moves are real copies, hand them to the worker pool
+                size = entry.stat(follow_symlinks=False).st_size
+                mover.submit(entry.path, os.path.join(sub_dir, entry.name), size, f"{rel_name} -> {category}")
+                continue
+            move_file(entry.path, sub_dir, entry.name, same_device)
+            log.success(f"Moved {rel_name} -> {category}")
+            stats["moved"] += 1
+        except Exception as e:
+            log.error(f"Failed to move {rel_name}: {e}")
+            stats["failed"] += 1
+
+    if mover:
+        mover.drain()
+        stats["moved"] += mover.moved - moved_before
+        stats["failed"] += len(mover.errors) - failed_before
+    log.flush()
+    return stats
+
+def open_folder_watcher(src_path: Path, poll_interval: float = 1.0):
+    """Starts an inotify watch on src_path, or returns None when watch_folder has to poll.
+
+    Open it before the first organizing pass, so files that arrive during
+    that pass are still reported.
+    """
+    try:
+        watcher = InotifyWatcher(str(src_path), IN_CLOSE_WRITE | IN_MOVED_TO)
+        print_info("Watching with inotify: files are filed as soon as they are closed.")
+        return watcher
+    except (OSError, AttributeError) as e:
+        print_info(f"inotify unavailable ({e}). Polling the folder every {poll_interval:g}s instead.")
+        return None
+
+def watch_folder(src_path: Path, dest_path: Path, classify, log: LogBuffer, special_log,
+                 mover: ParallelMover, watcher=None, debounce: float = 0.2, max_delay: float = 1.0,
+                 poll_interval: float = 1.0, settle: float = 2.0):
+    """Organizes files as they land in src_path until the user presses Ctrl+C.
+
+    watcher comes from open_folder_watcher and stays open for the caller to
+    close; without one the folder is polled.
+    """
+    src = str(src_path)
+    pending = set()
+    first_event = last_event = 0.0
+    totals = {"moved": 0, "logged": 0, "failed": 0}
+    seen_unsorted = set()  # Names already handled that stay in place (poll mode)
+    last_mtime = None  # Poll mode rescans once at the start to catch late arrivals and retries
+    if not watcher:
+        # Uncategorized files left by the first pass are already logged; anything else gets retried
+        seen_unsorted.update(e.name for e in iter_dir_files(src) if not classify(e))
+
+    def flush_batch(names):
+        batch_start = time.perf_counter()
+        entries = [e for e in (PathEntry(src, n) for n in sorted(names)) if e.is_file()]
+        if not entries:
+            return
+        stats = organize_files(entries, src, dest_path, classify, log, special_log, mover)
+        special_log.flush()
+        for key in totals:
+            totals[key] += stats[key]
+        ms = (time.perf_counter() - batch_start) * 1000
+        print_info(f"Filed a batch of {len(entries)} files in {ms:.0f} ms "
+                   f"({stats['moved']} moved, {stats['logged']} uncategorized).")
+
+    try:
+        while True:
+            now = time.monotonic()
+            if watcher:
+                # Block indefinitely while idle; otherwise wake up for the debounce deadline
+                timeout = None
+                if pending:
+                    timeout = max(0.0, min(last_event + debounce, first_event + max_delay) - now)
+                ready, _, _ = select.select([watcher], [], [], timeout)
+                if ready:
+                    for mask, name in watcher.read_events():
+                        if mask & IN_Q_OVERFLOW:
+                            # The kernel dropped events; fall back to a full listing
+                            pending.update(e.name for e in iter_dir_files(src))
+                        elif name:
+                            pending.add(name)
+                        if not first_event:
+                            first_event = time.monotonic()
+                        last_event = time.monotonic()
+                    continue
+                batch, pending = pending, set()
+                first_event = last_event = 0.0
+                flush_batch(batch)
+            else:
+                time.sleep(poll_interval)
+                try:
+                    mtime = os.stat(src).st_mtime_ns
+                except OSError as e:
+                    print_error(f"Lost access to '{src}': {e}")
+                    break
+                # Rescan when the listing changed, or when files were still being written last time
+                if mtime == last_mtime and not pending:
+                    continue
+                last_mtime = mtime
+                settled, pending = set(), set()
+                cutoff = time.time() - settle
+                for entry in iter_dir_files(src):
+                    if entry.name in seen_unsorted:
+                        continue
+                    try:
+                        if entry.stat().st_mtime > cutoff:
+                            pending.add(entry.name)  # Probably still being written
+                            continue
+                    except OSError:
+                        continue
+                    settled.add(entry.name)
+                if settled:
+                    seen_unsorted.update(n for n in settled if not classify(PathEntry(src, n)))
+                    flush_batch(settled)
+    except KeyboardInterrupt:
+        print("")
+        print_info("Watch mode stopped.")
+    finally:
+        log.flush()
+
+    print_success(f"While watching: {totals['moved']} files moved, {totals['logged']} logged as uncategorized.")
+    if totals["failed"]:
+        print_error(f"{totals['failed']} files could not be moved.")
+
 def run_folder_organizer():
     print_header("Folder Organizer Utility")
     
     src_path_str = input("Enter the absolute path of the folder to organize: ")
     dest_path_str = input("Enter the destination path (default: ~/MyShebangs): ")
+    recursive = input("Also organize files inside subfolders? (y/n, default: n): ").lower() == 'y'
+    sniff = input("Detect the type of unknown files from their content? (y/n, default: n): ").lower() == 'y'
+    table_str = input(f"Category table file (JSON, default: {ORGANIZER_CATEGORIES_FILE} if present): ")
+    verbose = input("Show a line for every file? (y/n, default: y): ").lower() != 'n'
+    watch = input("Keep watching the folder for new files afterwards? (y/n, default: n): ").lower() == 'y'
 
     src_path = Path(src_path_str).expanduser()
     
@@ -103,45 +750,62 @@ def run_folder_organizer():
         print_error(f"Source path '{src_path}' is not a valid directory. Aborting.")
         return
 
-    # Define file categories
-    CATEGORIES = {
-        "images": [".jpg", ".jpeg", ".png"],
-        "documents": [".doc", ".docx", ".txt", ".pdf"],
-        "spreadsheets": [".xls", ".xlsx", ".csv"],
-        "scripts": [".sh", ".py"],
-        "archives": [".zip", ".tar", ".tar.gz", ".tar.bz2"],
-        "presentations": [".ppt", ".pptx"],
-        "audio": [".mp3"],
-        "video": [".mp4"]
-    }
+    table_path = Path(table_str).expanduser() if table_str else ORGANIZER_CATEGORIES_FILE
+    categories = FOLDER_CATEGORIES
+    if table_str or table_path.is_file():
+        try:
+            categories = load_categories(table_path)
+            print_info(f"Using category table from '{table_path}'.")
+        except (OSError, ValueError) as e:
+            print_error(f"Could not load category table '{table_path}': {e}. Aborting.")
+            return
 
-    # Invert the mapping for faster lookups
-    EXT_MAP = {ext: category for category, exts in CATEGORIES.items() for ext in exts}
+    classify = FileClassifier(categories, sniff, get_cache_dir("organizer") / "classify-cache.json")
 
     dest_path.mkdir(parents=True, exist_ok=True)
     special_files_log = dest_path / "specialFiles.list"
-    files_moved = 0
+    log = LogBuffer(enabled=verbose)
+
+    # Moves across filesystems are copies; run those on a worker pool
+    workers, max_mb = 4, 256
+    if src_path.stat().st_dev != dest_path.stat().st_dev:
+        print_info("Source and destination are on different filesystems. Files will be copied.")
+        workers_str = input("Number of parallel copy workers (default: 4): ") or "4"
+        max_mb_str = input("Maximum MB being copied at once (default: 256): ") or "256"
+        if not (workers_str.isdigit() and int(workers_str) > 0 and max_mb_str.isdigit() and int(max_mb_str) > 0):
+            print_error("Invalid input. Workers and MB must be positive numbers. Aborting.")
+            return
+        workers, max_mb = int(workers_str), int(max_mb_str)
+    mover = ParallelMover(workers, max_mb << 20, log)
+    # Watch from before the first pass, so nothing that lands during it is missed
+    watcher = open_folder_watcher(src_path) if watch else None
+    try:
+        run_organizer_passes(src_path, dest_path, recursive, sniff, watch, watcher, classify, log,
+                             special_files_log, mover)
+    finally:
+        if watcher:
+            watcher.close()
+        mover.shutdown()
+
+    pause()
 
+def run_organizer_passes(src_path: Path, dest_path: Path, recursive: bool, sniff: bool, watch: bool, watcher,
+                         classify, log: LogBuffer, special_files_log: Path, mover: ParallelMover):
+    """The first organizing pass and its report, then watch mode if asked for."""
     print_info(f"Scanning '{src_path}'...")
+    start = time.perf_counter()
     with open(special_files_log, "w") as log_file:
         log_file.write("--- Log of Uncategorized Files ---\n")
-        
-        for file in src_path.glob("*"):
-            if file.is_file():
-                category = EXT_MAP.get(file.suffix.lower())
-                
-                if category:
-                    sub_dir = dest_path / category
-                    sub_dir.mkdir(exist_ok=True)
-                    try:
-                        shutil.move(str(file), str(sub_dir))
-                        print_success(f"Moved {file.name} -> {category}")
-                        files_moved += 1
-                    except Exception as e:
-                        print_error(f"Failed to move {file.name}: {e}")
-                else:
-                    log_file.write(f"{file.name}\n")
-                    print_info(f"Logged '{file.name}' to specialFiles.list")
+        # Never descend into the destination when it lives inside the source
+        entries = iter_dir_files(str(src_path), recursive, exclude={os.path.realpath(dest_path)})
+        try:
+            stats = organize_files(entries, str(src_path), dest_path, classify, log, log_file, mover)
+        finally:
+            classify.save()
+    elapsed = time.perf_counter() - start
+
+    files_moved = stats["moved"]
+    scanned = files_moved + stats["logged"] + stats["failed"]
 
     print_separator()
     if files_moved == 0:
@@ -149,7 +813,233 @@ def run_folder_organizer():
     else:
         print_success(f"Organization complete. {files_moved} files moved to '{dest_path}'.")
         print_info(f"Uncategorized files are logged in '{special_files_log}'")
-    
+    mover.report()
+    if sniff:
+        print_info(f"Content detection: {classify.files_read} files read, {classify.cache_hits} answered from cache.")
+    if stats["failed"]:
+        print_error(f"{stats['failed']} files could not be moved.")
+    print_info(f"Processed {scanned} files in {elapsed:.2f}s ({scanned / max(elapsed, 1e-9):.0f} files/sec).")
+
+    if watch:
+        print_separator()
+        if recursive:
+            print_info("Watch mode only follows new files in the top-level folder.")
+        print_info(f"Watching '{src_path}' for new files. Press Ctrl+C to stop.")
+        with open(special_files_log, "a") as log_file:
+            try:
+                watch_folder(src_path, dest_path, classify, log, log_file, mover, watcher)
+            finally:
+                classify.save()
+        mover.report()
+
+# --- 1b. Duplicate Finder (built on the Folder Organizer scan) ---
+EDGE_BYTES = 64 * 1024  # Bytes hashed from each end of a file in stage 2
+
+def hash_file_edges(path: str, size: int) -> str:
+    """Hashes the first and last 64 KiB of a file (the whole file if it is smaller)."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        h.update(f.read(EDGE_BYTES))
+        if size > 2 * EDGE_BYTES:
+            f.seek(-EDGE_BYTES, os.SEEK_END)
+        h.update(f.read(EDGE_BYTES))
+    return h.hexdigest()
+
+def hash_file_full(path: str, chunk_size: int) -> str:
+    """Streams a whole file through the hash, chunk_size bytes at a time."""
+    h = hashlib.blake2b(digest_size=20)
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+def regroup_by_hash(groups, hasher, workers: int, stats: dict):
+    """Splits each group of candidate files by hasher(path, size), hashing on a thread pool."""
+    jobs = [(size, f) for size, files in groups for f in files]
+    result = defaultdict(list)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = pool.map(lambda job: _try_hash(hasher, job[1][0], job[0]), jobs)
+        for (size, f), digest in zip(jobs, digests):
+            if digest is None:
+                stats["errors"] += 1
+                continue
+            result[(size, digest)].append(f)
+    return [(key, files) for key, files in result.items() if len(files) > 1]
+
+def _try_hash(hasher, path: str, size: int):
+    try:
+        return hasher(path, size)
+    except OSError:
+        return None
+
+def find_duplicates(root: str, workers: int = 4, memory_limit: int = 64 << 20) -> tuple:
+    """Finds duplicate files in three stages: size, edge hash, then a full hash."""
+    stats = {"files": 0, "size_candidates": 0, "edge_candidates": 0, "full_hashed": 0,
+             "bytes_read": 0, "errors": 0}
+
+    # Stage 1: group by size, straight from the scan (no file is opened here)
+    by_size = defaultdict(list)
+    inodes = {}  # Hardlinks already share their data, so each inode is hashed once
+    for entry in iter_dir_files(root, recursive=True):
+        try:
+            if entry.is_symlink():
+                continue
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            stats["errors"] += 1
+            continue
+        stats["files"] += 1
+        if st.st_size == 0:
+            continue  # Empty files are all "equal"
+        known = inodes.get((st.st_dev, st.st_ino))
+        if known:
+            known[3].append(entry.path)
+            continue
+        record = (entry.path, st.st_mtime, st.st_dev, [entry.path])
+        inodes[(st.st_dev, st.st_ino)] = record
+        by_size[st.st_size].append(record)
+    del inodes
+    size_groups = [(size, files) for size, files in by_size.items() if len(files) > 1]
+    del by_size
+    stats["size_candidates"] = sum(len(files) for _, files in size_groups)
+
+    # Stage 2: hash only the first and last 64 KiB of each size collision
+    edge_groups = regroup_by_hash(size_groups, hash_file_edges, workers, stats)
+    stats["bytes_read"] += sum(min(size, 2 * EDGE_BYTES) for size, files in size_groups for _ in files)
+    stats["edge_candidates"] = sum(len(files) for _, files in edge_groups)
+
+    # Stage 3: stream full hashes, but only where the edge hash could not decide
+    duplicates, to_hash = [], []
+    for (size, digest), files in edge_groups:
+        if size <= 2 * EDGE_BYTES:
+            duplicates.append((size, digest, files))  # The edge hash already covered every byte
+        else:
+            to_hash.append((size, files))
+    chunk_size = max(64 * 1024, memory_limit // max(workers, 1))
+    full_groups = regroup_by_hash(to_hash, lambda path, size: hash_file_full(path, chunk_size), workers, stats)
+    stats["full_hashed"] = sum(len(files) for _, files in to_hash)
+    stats["bytes_read"] += sum(size * len(files) for size, files in to_hash)
+    duplicates.extend((size, digest, files) for (size, digest), files in full_groups)
+
+    groups = []
+    for size, digest, files in sorted(duplicates, key=lambda d: d[0] * (len(d[2]) - 1), reverse=True):
+        files.sort(key=lambda f: (f[1], f[0]))  # Oldest copy first, that one is kept
+        groups.append({"size": size, "hash": digest, "files": [f[0] for f in files],
+                       "devices": [f[2] for f in files], "links": [f[3] for f in files]})
+    return groups, stats
+
+def dedupe_group(group: dict, action: str) -> tuple:
+    """Replaces every extra copy in a group with a hardlink to the first file, or deletes it."""
+    keep = group["files"][0]
+    done, failed = 0, []
+    for dev, links in zip(group["devices"][1:], group["links"][1:]):
+        # Every hardlink of an extra copy has to go, or its data is never freed
+        for path in links:
+            try:
+                if action == "hardlink":
+                    if dev != group["devices"][0]:
+                        raise OSError(errno.EXDEV, "on a different filesystem than the kept copy")
+                    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.dedupe")
+                    os.link(keep, tmp)
+                    os.replace(tmp, path)  # Atomic: the path never goes missing
+                else:
+                    os.unlink(path)
+                done += 1
+            except OSError as e:
+                failed.append((path, str(e)))
+    return done, failed
+
+def run_duplicate_finder():
+    print_header("Duplicate Finder")
+
+    scan_path_str = input("Enter the path of the folder to scan for duplicates: ")
+    workers_str = input("Number of hashing threads (default: 4): ") or "4"
+    mem_str = input("Memory limit for hashing in MB (default: 64): ") or "64"
+
+    scan_path = Path(scan_path_str).expanduser()
+
+    if not scan_path.is_dir():
+        print_error(f"Path '{scan_path}' is not a valid directory. Aborting.")
+        return
+
+    if not (workers_str.isdigit() and int(workers_str) > 0 and mem_str.isdigit() and int(mem_str) > 0):
+        print_error("Invalid input. Threads and memory must be positive numbers. Aborting.")
+        return
+
+    print_info(f"Scanning '{scan_path}'...")
+    start = time.perf_counter()
+    groups, stats = find_duplicates(str(scan_path), int(workers_str), int(mem_str) << 20)
+    elapsed = time.perf_counter() - start
+
+    wasted = sum(g["size"] * (len(g["files"]) - 1) for g in groups)
+    print_separator()
+    print_info(f"Scanned {stats['files']} files in {elapsed:.2f}s.")
+    print_info(f"Same size: {stats['size_candidates']}, same first/last 64 KiB: {stats['edge_candidates']}, "
+               f"fully hashed: {stats['full_hashed']} ({stats['bytes_read'] / (1 << 20):.1f} MB read).")
+    if stats["errors"]:
+        print_error(f"{stats['errors']} files could not be read and were skipped.")
+
+    if not groups:
+        print_success("No duplicate files found.")
+        pause()
+        return
+
+    print_info(f"Found {YELLOW}{len(groups)} groups{NC} of duplicates wasting {YELLOW}{wasted / (1 << 20):.1f} MB{NC}.")
+    for g in groups[:10]:
+        print(f"  [{g['size']} bytes] {g['files'][0]}")
+        for links in g["links"][1:]:
+            print(f"      = {', '.join(links)}")
+    if len(groups) > 10:
+        print_info(f"... and {len(groups) - 10} more groups (see the report).")
+
+    datestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    default_report = Path.home() / f"duplicates_{datestamp}.json"
+    report_str = input(f"Save JSON report to (default: {default_report}): ")
+    report_path = Path(report_str).expanduser() if report_str else default_report
+    report = {
+        "root": str(scan_path),
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "stats": stats,
+        "wasted_bytes": wasted,
+        "groups": [{"size": g["size"], "hash": g["hash"], "files": g["links"]} for g in groups],
+    }
+    try:
+        report_path.write_text(json.dumps(report, indent=2))
+        print_success(f"Report saved to '{report_path}'.")
+    except OSError as e:
+        print_error(f"Could not write the report: {e}")
+
+    print_separator()
+    print_info("The oldest copy in each group is kept.")
+    action = input("Replace extra copies with (h)ardlinks, (d)elete them, or do (n)othing? ").lower()
+    if action not in ("h", "d"):
+        print_info("No files were changed.")
+        pause()
+        return
+
+    action = "hardlink" if action == "h" else "delete"
+    print_error(f"This will {action} {sum(len(links) for g in groups for links in g['links'][1:])} files. This is permanent.")
+    if input("Type 'yes' to confirm: ") != "yes":
+        print_info("Invalid confirmation. Aborting. No files were changed.")
+        pause()
+        return
+
+    done, failures = 0, []
+    for g in groups:
+        n, failed = dedupe_group(g, action)
+        done += n
+        failures.extend(failed)
+    print_success(f"{action.capitalize()} complete for {done} files.")
+    for path, err in failures[:20]:
+        print_error(f"  Failed on {path}: {err}")
+    if len(failures) > 20:
+        print_info(f"  ... and {len(failures) - 20} more failures.")
+
     pause()
 
 # --- 2. Password Generator ---
@@ -183,6 +1073,438 @@ def run_password_generator():
     pause()
 
 # --- 3. Curf Remover (Safe File Cleaner) ---
+class ScanIndex:
+    """SQLite record of each folder's mtime and the oldest mtime found beneath it.
+
+    The index is only a hint: a missing or corrupt database is simply rebuilt,
+    and WAL mode plus a busy timeout let concurrent runs share it safely.
+    """
+
+    BATCH = 5000
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.pending = []
+        self.db = None
+        try:
+            self.db = self._connect()
+        except sqlite3.DatabaseError:
+            self._reset()
+
+    def _connect(self):
+        db = sqlite3.connect(str(self.path), timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS dirs ("
+                   "path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, oldest REAL NOT NULL) WITHOUT ROWID")
+        db.commit()
+        return db
+
+    def _reset(self):
+        if self.db:
+            self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.unlink(f"{self.path}{suffix}")
+            except OSError:
+                pass
+        print_info("Scan index was unreadable and has been rebuilt.")
+        self.db = self._connect()
+
+    def lookup(self, path: str):
+        """Returns (mtime_ns, oldest) recorded for a folder, or None."""
+        try:
+            return self.db.execute("SELECT mtime_ns, oldest FROM dirs WHERE path = ?", (path,)).fetchone()
+        except sqlite3.DatabaseError:
+            self._reset()
+            return None
+
+    def record(self, path: str, mtime_ns: int, oldest: float):
+        self.pending.append((path, mtime_ns, oldest))
+        if len(self.pending) >= self.BATCH:
+            self.flush()
+
+    def forget(self, path: str, subtree: bool = True):
+        self.pending.append((path, None if subtree else 0, None))
+
+    def flush(self):
+        if not self.pending:
+            return
+        try:
+            with self.db:
+                for path, mtime_ns, oldest in self.pending:
+                    if mtime_ns is None:
+                        # Everything under path/ sorts between "path/" and "path0" ('0' follows '/'),
+                        # compared bytewise, so no LIKE wildcards or case folding get in the way
+                        self.db.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                                        (path, path + "/", path + "0"))
+                    elif mtime_ns == 0:
+                        self.db.execute("DELETE FROM dirs WHERE path = ?", (path,))
+                    else:
+                        self.db.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)", (path, mtime_ns, oldest))
+        except sqlite3.DatabaseError:
+            self._reset()
+        self.pending.clear()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+def sweep_old_items(root: str, cutoff: float, action, index: ScanIndex = None,
+                    dry_run: bool = False, stats: dict = None):
+    """Walks root bottom-up in one pass and yields (kind, path, removed) for each old item.
+
+    Files qualify when their mtime is at or before cutoff. A folder qualifies when
+    its own mtime (taken before the sweep touched it) is old enough and nothing is
+    left inside it, so folders emptied by this sweep are picked up too.
+    action(kind, path) decides each candidate and returns True if it is (or, in a
+    dry run, would be) removed. Memory is bounded by the folder depth.
+
+    With an index, every folder's state is recorded as the walk finishes it. In a
+    dry run that is the tree as it is now, candidates included. A subfolder whose
+    mtime is unchanged and whose recorded oldest mtime is still newer than cutoff
+    is skipped without being read. Files moved deep into such a folder with an old
+    mtime preserved are only noticed once the recorded oldest mtime falls past the
+    cutoff.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("skipped_dirs", 0)
+    inf = float("inf")
+
+    # Each frame: [path, scandir iterator, children left, mtime, mtime_ns,
+    #              oldest mtime still on disk below it, deleted something]
+    root_st = os.stat(root)
+    stack = [[root, os.scandir(root), 0, root_st.st_mtime, root_st.st_mtime_ns, inf, False]]
+    try:
+        while stack:
+            frame = stack[-1]
+            entry = next(frame[1], None)
+
+            if entry is None:
+                frame[1].close()
+                stack.pop()
+                parent = stack[-1] if stack else None
+                removed = False
+                if parent and frame[2] == 0 and frame[3] <= cutoff:
+                    removed = action("dir", frame[0])
+                    yield ("dir", frame[0], removed)
+                    if removed and not dry_run:
+                        parent[6] = True
+                        if index:
+                            index.forget(frame[0])
+                        continue
+
+                mtime, mtime_ns = frame[3], frame[4]
+                if frame[6]:
+                    try:
+                        st = os.stat(frame[0])  # Our deletions bumped its mtime
+                        mtime, mtime_ns = st.st_mtime, st.st_mtime_ns
+                    except OSError:
+                        mtime_ns = None
+                # An emptied folder only ages by its own mtime
+                oldest = frame[5] if frame[5] != inf else mtime
+                if index and mtime_ns is not None:
+                    index.record(frame[0], mtime_ns, oldest)
+                if parent:
+                    if not removed:
+                        parent[2] += 1
+                    parent[5] = min(parent[5], oldest)
+                continue
+
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    known = index.lookup(entry.path) if index else None
+                    if known and known[0] == st.st_mtime_ns and known[1] > cutoff:
+                        # Unchanged, and nothing under it is old enough yet
+                        stats["skipped_dirs"] += 1
+                        frame[2] += 1
+                        frame[5] = min(frame[5], known[1])
+                        continue
+                    stack.append([entry.path, os.scandir(entry.path), 0, st.st_mtime, st.st_mtime_ns, inf, False])
+                    continue
+                # Like 'find -type f', symlinks and special files are never touched
+                if not entry.is_file(follow_symlinks=False):
+                    frame[2] += 1
+                    continue
+                mtime = entry.stat(follow_symlinks=False).st_mtime
+                if mtime <= cutoff:
+                    removed = action("file", entry.path)
+                    yield ("file", entry.path, removed)
+                    if removed:
+                        if dry_run:
+                            frame[5] = min(frame[5], mtime)  # Still on disk for now
+                        else:
+                            frame[6] = True
+                        continue
+                frame[2] += 1
+                frame[5] = min(frame[5], mtime)
+            except OSError:
+                frame[2] += 1
+                frame[5] = -inf  # Unreadable: never trust this folder as "clean"
+    finally:
+        for frame in stack:
+            frame[1].close()
+
+def parse_size(text: str) -> int:
+    """Parses sizes like '200G', '1.5T', '512M' or plain bytes (powers of 1024)."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?\s*", text.upper())
+    if not match:
+        raise ValueError(f"'{text}' is not a size")
+    return int(float(match.group(1)) * 1024 ** " KMGT".index(match.group(2) or " "))
+
+def format_size(size: float) -> str:
+    """Formats a byte count for humans (e.g. '12.3 GB')."""
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if abs(size) < 1024 or unit == "TB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+
+def iter_tree_files(root: str):
+    """Yields (path, bytes on disk, mtime) for every regular file below root."""
+    for entry in iter_dir_files(root, recursive=True):
+        try:
+            if entry.is_symlink():
+                continue
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+        if st.st_nlink > 1:
+            continue  # Deleting one name of a hardlinked file frees nothing
+        yield entry.path, getattr(st, "st_blocks", 0) * 512 or st.st_size, st.st_mtime
+
+def select_oldest_to_free(files, need: int) -> list:
+    """Picks the oldest files whose sizes add up to need bytes, oldest first.
+
+    A max-heap keyed on mtime holds only the current selection: whenever the
+    kept files cover the need without the newest one, that one is dropped. So
+    memory follows the number of files to delete, not the size of the tree.
+    """
+    heap = []  # (-mtime, path, size): the newest selected file sits on top
+    total = 0
+    for path, size, mtime in files:
+        if not size:
+            continue
+        if total >= need and heap and mtime >= -heap[0][0]:
+            continue  # Newer than everything already selected
+        heapq.heappush(heap, (-mtime, path, size))
+        total += size
+        while total - heap[0][2] >= need:
+            total -= heapq.heappop(heap)[2]
+    return sorted((-neg_mtime, path, size) for neg_mtime, path, size in heap)
+
+def run_curf_budget(root: str, target: str):
+    """Deletes the oldest files until a folder size or filesystem usage budget is met."""
+    try:
+        if target.endswith("%"):
+            percent = float(target[:-1])
+            if not 0 <= percent < 100:
+                raise ValueError("the percentage must be between 0 and 100")
+        else:
+            budget = parse_size(target)
+    except ValueError as e:
+        print_error(f"Invalid budget: {e}. Aborting.")
+        return
+
+    # 1. Work out how many bytes have to go
+    if target.endswith("%"):
+        vfs = os.statvfs(root)
+        size = vfs.f_blocks * vfs.f_frsize
+        if not size:
+            print_error(f"The filesystem of '{root}' reports a total size of 0; use a size budget instead. Aborting.")
+            return
+        used = (vfs.f_blocks - vfs.f_bfree) * vfs.f_frsize
+        need = int(used - size * percent / 100)
+        print_info(f"Filesystem usage: {format_size(used)} of {format_size(size)} ({used / size:.1%}), target {percent:g}%.")
+    else:
+        # The need is only known after a full walk; summing a stream keeps memory flat
+        print_info(f"Measuring '{root}'...")
+        used = sum(size for _, size, _ in iter_tree_files(root))
+        need = used - budget
+        print_info(f"Folder uses {format_size(used)}, budget is {format_size(budget)}.")
+
+    if need <= 0:
+        print_success("Already within budget. Nothing to delete.")
+        return
+
+    # 2. Walk the tree again as a stream, keeping only the oldest files that cover the need
+    print_info(f"Selecting the oldest files to free {format_size(need)}...")
+    selected = select_oldest_to_free(iter_tree_files(root), need)
+    freeable = sum(size for _, _, size in selected)
+
+    if not selected:
+        print_info("No files could be found to delete.")
+        return
+
+    print_separator()
+    print_info("You can review the list below (oldest first):")
+    review = LogBuffer()
+    for mtime, path, size in selected:
+        review.add(f"  [FILE] {datetime.fromtimestamp(mtime):%Y-%m-%d %H:%M}  {format_size(size):>10}  {path}")
+    review.flush()
+    print_separator()
+    print_info(f"Found {YELLOW}{len(selected)} files{NC} freeing {YELLOW}{format_size(freeable)}{NC}.")
+    if freeable < need:
+        print_error(f"Deleting all of them still leaves the target {format_size(need - freeable)} short.")
+    print_error("This action is permanent. Are you sure?")
+    confirm = input("Type 'interactive' to confirm one-by-one, or 'ALL' to delete all: ")
+
+    # 3. Delete in age order until the budget is met
+    freed = 0
+    if confirm == 'interactive':
+        print_info("Starting interactive deletion...")
+        for mtime, path, size in selected:
+            if freed >= need:
+                break
+            choice = input(f"  Delete file '{path}' ({format_size(size)})? (y/n): ").lower()
+            if choice == 'y' and delete_item("file", path):
+                freed += size
+                print_success(f"    Deleted {os.path.basename(path)}")
+        print_success(f"Interactive cleanup complete. Freed {format_size(freed)}.")
+
+    elif confirm == 'ALL':
+        print_info("Starting bulk deletion...")
+        done = LogBuffer()
+        for mtime, path, size in selected:
+            if freed >= need:
+                break
+            if delete_item("file", path):
+                freed += size
+                done.success(f"  Deleted {path}")
+        done.flush()
+        print_success(f"Bulk cleanup complete. Freed {format_size(freed)}.")
+
+    else:
+        print_info("Invalid confirmation. Aborting. No files were deleted.")
+
+class RateLimiter:
+    """Token bucket shared by worker threads; a rate of 0 means unlimited."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + 1 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+class DeletionExecutor:
+    """Fans unlinks out over a thread pool, batched by parent folder.
+
+    Used as the sweep action: files are queued and reported as removed right away,
+    while a folder removal first waits for the unlinks queued inside it (and is
+    skipped if any of them failed, since the folder is then not empty).
+    """
+
+    def __init__(self, workers: int = 8, rate: float = 0, batch_size: int = 256):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(workers * 4)
+        self.limiter = RateLimiter(rate)
+        self.batch_size = batch_size
+        self.batch_parent, self.batch = None, []
+        self.lock = threading.Lock()
+        self.in_flight = defaultdict(list)  # parent folder -> futures still running
+        self.failed_in = defaultdict(int)   # parent folder -> failed unlinks
+        self.failures = []                  # (path, error)
+        self.deleted = 0
+        self.started = time.monotonic()
+        self.last_report = 0.0
+
+    def __call__(self, kind: str, path: str) -> bool:
+        if kind == "file":
+            parent = os.path.dirname(path)
+            if parent != self.batch_parent or len(self.batch) >= self.batch_size:
+                self._submit()
+                self.batch_parent = parent
+            self.batch.append(path)
+            return True
+        return self._remove_dir(path)
+
+    def _submit(self):
+        if not self.batch:
+            return
+        parent, batch = self.batch_parent, self.batch
+        self.batch = []
+        self.slots.acquire()
+        future = self.pool.submit(self._unlink_batch, batch)
+        with self.lock:
+            self.in_flight[parent].append(future)
+        future.add_done_callback(lambda f, parent=parent: self._batch_done(parent, f))
+
+    def _batch_done(self, parent: str, future):
+        self.slots.release()
+        with self.lock:
+            futures = self.in_flight.get(parent)
+            if futures:
+                futures.remove(future)
+                if not futures:
+                    del self.in_flight[parent]
+
+    def _unlink_batch(self, paths: list):
+        for path in paths:
+            self.limiter.wait()
+            try:
+                os.unlink(path)
+                with self.lock:
+                    self.deleted += 1
+            except OSError as e:
+                with self.lock:
+                    self.failures.append((path, str(e)))
+                    self.failed_in[os.path.dirname(path)] += 1
+
+    def _remove_dir(self, path: str) -> bool:
+        if self.batch_parent == path:
+            self._submit()
+        with self.lock:
+            futures = list(self.in_flight.get(path, ()))
+        wait(futures)
+        with self.lock:
+            if self.failed_in.pop(path, 0):
+                return False
+        self.limiter.wait()
+        try:
+            os.rmdir(path)
+        except OSError as e:
+            with self.lock:
+                self.failures.append((path, str(e)))
+            return False
+        with self.lock:
+            self.deleted += 1
+        return True
+
+    def finish(self):
+        self._submit()
+        self.pool.shutdown(wait=True)
+
+    def show_progress(self, final: bool = False):
+        """Redraws a one-line counter at most twice a second."""
+        now = time.monotonic()
+        if not final and now - self.last_report < 0.5:
+            return
+        self.last_report = now
+        rate = self.deleted / max(now - self.started, 1e-9)
+        line = f"\r{YELLOW}[INFO] Deleted {self.deleted} items ({rate:.0f}/s), {len(self.failures)} failed{NC}"
+        sys.stdout.write(line + ("\n" if final else ""))
+        sys.stdout.flush()
+
+def delete_item(kind: str, path: str) -> bool:
+    """Deletes a file or an empty folder, reporting failures instead of raising."""
+    try:
+        if kind == "file":
+            os.unlink(path)
+        else:
+            os.rmdir(path)
+        return True
+    except OSError as e:
+        print_error(f"  Failed to delete {path}: {e}")
+        return False
+
 def run_curf_remover():
     print_header("Curf Remover (Old File Cleaner)")
     
@@ -192,7 +1514,12 @@ def run_curf_remover():
     print_separator()
     
     clean_path_str = input("Enter the absolute path of the folder to clean: ")
-    days_str = input("Delete files OLDER than how many days? (default: 15): ") or "15"
+    mode = input("Clean by (a)ge or by (s)ize budget? (default: a): ").lower() or "a"
+    if mode == "s":
+        target = input("Keep the folder under a size (e.g. 200G) or the filesystem under a usage (e.g. 80%): ")
+    else:
+        days_str = input("Delete files OLDER than how many days? (default: 15): ") or "15"
+        use_index = input("Use the scan index to skip unchanged folders? (y/n, default: n): ").lower() == 'y'
 
     clean_path = Path(clean_path_str).expanduser()
 
@@ -200,79 +1527,112 @@ def run_curf_remover():
         print_error(f"Path '{clean_path}' is not a valid directory. Aborting.")
         return
 
+    if mode == "s":
+        run_curf_budget(os.path.realpath(clean_path), target.strip())
+        pause()
+        return
+
     if not days_str.isdigit() or int(days_str) < 0:
         print_error("Invalid input. Days must be a non-negative number. Aborting.")
         return
 
     print_info(f"Searching for files in '{clean_path}' older than {days_str} days...")
 
-    # Use 'find' as it's more direct for -mtime and -empty
-    def find_items(cmd_args):
-        try:
-            result = subprocess.run(cmd_args, capture_output=True, text=True, check=True, encoding='utf-8')
-            # Split lines and filter out empty strings
-            return [Path(line) for line in result.stdout.strip().split('\n') if line]
-        except subprocess.CalledProcessError as e:
-            print_error(f"Find command failed: {e.stderr}")
-            return []
-        except FileNotFoundError:
-            print_error("`find` command not found. This tool is not compatible with your system.")
-            return []
-
-    files_cmd = ["find", str(clean_path), "-type", "f", "-mtime", f"+{days_str}"]
-    dirs_cmd = ["find", str(clean_path), "-mindepth", "1", "-type", "d", "-empty", "-mtime", f"+{days_str}"]
+    # Same rule as 'find -mtime +N': at least N+1 full days old
+    cutoff = time.time() - (int(days_str) + 1) * 86400
+    root = os.path.realpath(clean_path)
+    index = ScanIndex(get_cache_dir("curf") / "scan-index.sqlite") if use_index else None
+    try:
+        run_curf_sweeps(root, cutoff, days_str, index)
+    finally:
+        if index:
+            index.close()
 
-    files_to_delete = find_items(files_cmd)
-    dirs_to_delete = find_items(dirs_cmd) # Find empty dirs first
+    pause()
 
-    file_count = len(files_to_delete)
-    dir_count = len(dirs_to_delete)
+def run_curf_sweeps(root: str, cutoff: float, days_str: str, index: ScanIndex):
+    """Dry-run sweep, confirmation, then the deleting sweep of the Curf Remover."""
+    # 1. Dry run: stream the candidates, nothing is deleted yet
+    file_count = dir_count = 0
+    review = LogBuffer()
+    stats = {}
+    for kind, path, _ in sweep_old_items(root, cutoff, lambda kind, path: True, index, dry_run=True, stats=stats):
+        if not file_count + dir_count:
+            # Long lists flush while the sweep runs, so the header has to come first
+            print_separator()
+            print_info("You can review the list below:")
+        if kind == "file":
+            file_count += 1
+            review.add(f"  [FILE] {path}")
+        else:
+            dir_count += 1
+            review.add(f"  [DIR]  {path}")
     total_count = file_count + dir_count
 
+    review.flush()
+    if index:
+        print_info(f"Scan index: skipped {stats['skipped_dirs']} unchanged folders.")
+
     if total_count == 0:
         print_success(f"No files or empty folders found older than {days_str} days.")
         return
 
     print_separator()
     print_info(f"Found {YELLOW}{file_count} files{NC} and {YELLOW}{dir_count} empty folders{NC} to delete.")
-    print("You can review the list below:")
-    
-    for f in files_to_delete: print(f"  [FILE] {f}")
-    for d in dirs_to_delete: print(f"  [DIR]  {d}")
-    
-    print_separator()
     print_error("This action is permanent. Are you sure?")
     confirm = input("Type 'interactive' to confirm one-by-one, or 'ALL' to delete all: ")
 
+    # 2. Second sweep: the same walk, now deciding each item for real
     if confirm == 'interactive':
         print_info("Starting interactive deletion...")
-        for item in files_to_delete + dirs_to_delete:
-            item_type = "file" if item.is_file() else "directory"
-            choice = input(f"  Delete {item_type} '{item}'? (y/n): ").lower()
-            if choice == 'y':
-                try:
-                    if item.is_file(): item.unlink()
-                    elif item.is_dir(): item.rmdir()
-                    print_success(f"    Deleted {item.name}")
-                except Exception as e:
-                    print_error(f"    Failed to delete {item.name}: {e}")
+
+        def ask(kind, path):
+            item_type = "file" if kind == "file" else "directory"
+            choice = input(f"  Delete {item_type} '{path}'? (y/n): ").lower()
+            return choice == 'y' and delete_item(kind, path)
+
+        for kind, path, removed in sweep_old_items(root, cutoff, ask, index):
+            if removed:
+                print_success(f"    Deleted {os.path.basename(path)}")
         print_success("Interactive cleanup complete.")
             
     elif confirm == 'ALL':
+        workers_str = input("Number of deletion threads (default: 8): ") or "8"
+        rate_str = input("Maximum deletions per second (0 = unlimited, default: 0): ") or "0"
+        if not (workers_str.isdigit() and int(workers_str) > 0 and rate_str.isdigit()):
+            print_error("Invalid input. Threads and rate must be numbers. Aborting. No files were deleted.")
+            return
+
         print_info("Starting bulk deletion...")
-        for item in files_to_delete + dirs_to_delete:
+        executor = DeletionExecutor(int(workers_str), int(rate_str))
+        try:
+            for _ in sweep_old_items(root, cutoff, executor, index):
+                executor.show_progress()
+        finally:
+            executor.finish()
+            executor.show_progress(final=True)
+
+        if executor.failures:
+            if index:
+                # A file that survived must not be hidden behind a "clean" folder record
+                for path, _ in executor.failures:
+                    parent = os.path.dirname(path)
+                    while parent.startswith(root):
+                        index.forget(parent, subtree=False)
+                        parent = os.path.dirname(parent)
+            datestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+            failure_log = Path.home() / f"curf_remover_failures_{datestamp}.log"
             try:
-                if item.is_file(): item.unlink()
-                elif item.is_dir(): item.rmdir()
-                print_success(f"  Deleted {item}")
-            except Exception as e:
-                print_error(f"  Failed to delete {item}: {e}")
+                with open(failure_log, "w") as f:
+                    for path, err in executor.failures:
+                        f.write(f"{path}\t{err}\n")
+                print_error(f"{len(executor.failures)} items could not be deleted. See '{failure_log}'.")
+            except OSError as e:
+                print_error(f"{len(executor.failures)} items could not be deleted (log not written: {e}).")
         print_success("Bulk cleanup complete.")
             
     else:
         print_info("Invalid confirmation. Aborting. No files were deleted.")
-    
-    pause()
 
 # --- 4. User Creator ---
 def run_user_creator():
@@ -335,18 +1695,207 @@ def run_user_creator():
     pause()
 
 # --- 5. Indexer (Batch File Renamer) ---
+INDEXER_JOURNAL = ".indexer-journal"
+
+def plan_renames(target_dir: str, prefix: str) -> tuple:
+    """Builds the rename plan from one scandir pass.
+
+    Returns (mapping, steps, collisions): mapping is the (old, new) name for every
+    file, steps the ordered renames to run, and collisions any target names held
+    by something that is not being renamed (a folder, for instance). Files whose
+    name is also a target are first moved to a temporary name, which keeps
+    chains and cycles (a -> b -> a) from clobbering each other.
+    """
+    names, files = set(), []
+    with os.scandir(target_dir) as it:
+        for entry in it:
+            names.add(entry.name)
+            if entry.name != INDEXER_JOURNAL and entry.is_file():
+                files.append(entry.name)
+    files.sort()
+
+    # new_name preserves the original extension
+    mapping = [(old, f"{prefix}{i:03d}{Path(old).suffix}") for i, old in enumerate(files, 1)]
+    sources = set(files)
+    collisions = [new for _, new in mapping if new in names and new not in sources]
+
+    moves = [(old, new) for old, new in mapping if old != new]
+    targets = {new for _, new in moves}
+    token = secrets.token_hex(4)
+    staged, steps = {}, []
+    for i, (old, _) in enumerate(moves):
+        if old in targets:
+            staged[old] = f".indexer-{token}-{i}"
+            steps.append((old, staged[old]))
+    steps.extend((staged.get(old, old), new) for old, new in moves)
+    return mapping, steps, collisions
+
+INDEXER_JOURNAL_BATCH = 256  # Renames between journal fsyncs
+
+def rename_no_clobber(src: str, dst: str):
+    """Renames src to dst, refusing (FileExistsError) when dst already exists."""
+    # rename() would silently replace dst; the plan never needs that, so it means trouble
+    if os.path.lexists(dst):
+        raise FileExistsError(errno.EEXIST, "Refusing to overwrite an existing file", dst)
+    os.rename(src, dst)
+
+def run_rename_journal(target_dir: str, steps: list, start: int = 0, undo: bool = False) -> int:
+    """Runs rename steps (or undoes them, newest first), logging progress to the journal.
+
+    The log is fsynced after every INDEXER_JOURNAL_BATCH renames, before the next
+    batch starts, so a crash leaves at most one batch for recovery to work out.
+    """
+    journal_path = os.path.join(target_dir, INDEXER_JOURNAL)
+    order = range(start - 1, -1, -1) if undo else range(start, len(steps))
+    done = 0
+    with open(journal_path, "a") as journal:
+        try:
+            for n, i in enumerate(order, 1):
+                src, dst = steps[i]
+                if undo:
+                    src, dst = dst, src
+                rename_no_clobber(os.path.join(target_dir, src), os.path.join(target_dir, dst))
+                journal.write(f"{'-' if undo else ''}{i}\n")
+                done += 1
+                if n % INDEXER_JOURNAL_BATCH == 0:
+                    journal.flush()
+                    os.fsync(journal.fileno())
+        finally:
+            journal.flush()
+            os.fsync(journal.fileno())
+    return done
+
+def load_rename_journal(target_dir: str) -> tuple:
+    """Reads a journal and returns (steps, number of steps currently applied).
+
+    The fsynced log gives a bound. The header records each source's inode, so
+    the exact position is the nearest step count past that bound whose
+    simulated name -> inode state matches the folder. Presence checks alone
+    cannot tell apart chains such as x -> tmp, a -> x. Raises ValueError when no
+    state matches, e.g. because the folder was changed by hand.
+    """
+    with open(os.path.join(target_dir, INDEXER_JOURNAL)) as f:
+        header = json.loads(f.readline())
+        steps = [tuple(step) for step in header["steps"]]
+        applied = 0
+        undoing = False
+        for line in f:
+            line = line.strip()
+            if not line.lstrip("-").isdigit():
+                continue  # A torn last line from the crash
+            undoing = line.startswith("-")
+            if undoing:
+                applied = min(applied, int(line[1:]))
+            else:
+                applied = max(applied, int(line) + 1)
+    inodes = header.get("inodes")
+
+    def on_disk(name):
+        try:
+            return os.lstat(os.path.join(target_dir, name)).st_ino
+        except FileNotFoundError:
+            return None
+
+    if inodes is None:
+        # Journals from before inodes were recorded: infer from presence alone
+        while applied < len(steps) and on_disk(steps[applied][0]) is None and on_disk(steps[applied][1]) is not None:
+            applied += 1
+        while applied > 0 and on_disk(steps[applied - 1][0]) is not None and on_disk(steps[applied - 1][1]) is None:
+            applied -= 1
+        return steps, applied
+
+    names = {name for step in steps for name in step}
+    state = {name: inodes.get(name) for name in names}
+    current = {name: on_disk(name) for name in names}
+    candidates = []
+    mismatched = sum(state[name] != current[name] for name in names)
+    for k in range(len(steps) + 1):
+        if not mismatched:
+            candidates.append(k)
+        if k == len(steps):
+            break
+        src, dst = steps[k]
+        for name, value in ((dst, state[src]), (src, None)):
+            mismatched -= state[name] != current[name]
+            state[name] = value
+            mismatched += state[name] != current[name]
+    # Unlogged renames move a run past the log: forward when resuming, backward when rolling back
+    if undoing:
+        matching = [k for k in candidates if k <= applied][-1:]
+    else:
+        matching = [k for k in candidates if k >= applied][:1]
+    if not matching:
+        raise ValueError("the folder no longer matches any point of the rename plan")
+    return steps, matching[0]
+
+def start_rename_journal(target_dir: str, steps: list):
+    """Durably writes the full plan, with the inode of every source, before the first rename."""
+    journal_path = os.path.join(target_dir, INDEXER_JOURNAL)
+    inodes = {}
+    for src, _ in steps:
+        try:
+            inodes[src] = os.lstat(os.path.join(target_dir, src)).st_ino
+        except FileNotFoundError:
+            pass  # A staged name, created by an earlier step
+    with open(journal_path, "w") as f:
+        f.write(json.dumps({"version": 2, "steps": steps, "inodes": inodes}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def finish_rename_journal(target_dir: str):
+    os.unlink(os.path.join(target_dir, INDEXER_JOURNAL))
+    dir_fd = os.open(target_dir, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def recover_indexer(target_dir: str):
+    """Resumes or rolls back an interrupted rename run."""
+    try:
+        steps, applied = load_rename_journal(target_dir)
+    except (OSError, ValueError, KeyError) as e:
+        print_error(f"The rename journal is unreadable: {e}")
+        return
+
+    print_error("An interrupted rename was found in this folder.")
+    print_info(f"{applied} of {len(steps)} renames were completed.")
+    choice = input("(r)esume it, roll it (b)ack, or leave it for (l)ater? ").lower()
+    try:
+        if choice == "r":
+            run_rename_journal(target_dir, steps, applied)
+            finish_rename_journal(target_dir)
+            print_success(f"Resumed and completed the remaining {len(steps) - applied} renames.")
+        elif choice == "b":
+            run_rename_journal(target_dir, steps, applied, undo=True)
+            finish_rename_journal(target_dir)
+            print_success(f"Rolled back {applied} renames. The folder is back to its original names.")
+        else:
+            print_info("Left the journal in place. No files were renamed.")
+    except OSError as e:
+        print_error(f"Recovery stopped: {e}. Run the Indexer again to continue.")
+
 def run_indexer():
     print_header("Indexer (Batch File Renamer)")
     
     target_dir_str = input("Enter the path to the directory with files to rename: ")
-    prefix = input("Enter a new prefix for the files (e.g., 'report-'): ") or "file-"
-
     target_dir = Path(target_dir_str).expanduser()
 
     if not target_dir.is_dir():
         print_error(f"Directory '{target_dir}' does not exist. Aborting.")
         return
 
+    if (target_dir / INDEXER_JOURNAL).exists():
+        recover_indexer(str(target_dir))
+        pause()
+        return
+
+    prefix = input("Enter a new prefix for the files (e.g., 'report-'): ") or "file-"
+
+    if "/" in prefix or prefix.startswith(".indexer-"):
+        print_error("Invalid prefix. It cannot contain '/' or start with the reserved '.indexer-'. Aborting.")
+        return
+
     print_info(f"This will rename all files in '{target_dir}' to '{prefix}[number].[original_extension]'.")
     print_error("WARNING: This action is permanent.")
     confirm = input("Are you sure you want to proceed? (y/n): ").lower()
@@ -355,30 +1904,669 @@ def run_indexer():
         print_info("Aborting. No files were renamed.")
         return
 
-    i = 1
-    renamed_count = 0
-    
-    # Use sorted() for a predictable order
-    for old_path in sorted(target_dir.glob("*")):
-        if old_path.is_file():
-            # new_name preserves the original extension
-            new_name = f"{prefix}{i:03d}{old_path.suffix}"
-            new_path = target_dir / new_name
-            
-            try:
-                # Use rename for speed
-                old_path.rename(new_path)
-                print_success(f"Renamed '{old_path.name}' -> '{new_name}'")
-                renamed_count += 1
-                i += 1
-            except Exception as e:
-                print_error(f"Failed to rename '{old_path.name}': {e}")
+    mapping, steps, collisions = plan_renames(str(target_dir), prefix)
+    if collisions:
+        print_error(f"{len(collisions)} target names are taken by entries that are not being renamed:")
+        for name in collisions[:10]:
+            print_error(f"  {name}")
+        print_info("Aborting. No files were renamed.")
+        return
+
+    try:
+        start_rename_journal(str(target_dir), steps)
+        run_rename_journal(str(target_dir), steps)
+        finish_rename_journal(str(target_dir))
+    except OSError as e:
+        print_error(f"Renaming stopped: {e}")
+        print_info("Run the Indexer on this folder again to resume or roll back.")
+        pause()
+        return
+
+    log = LogBuffer()
+    for old, new in mapping:
+        if old != new:
+            log.success(f"Renamed '{old}' -> '{new}'")
+    log.flush()
     
     print_separator()
-    print_success(f"Renaming complete. {renamed_count} files were indexed.")
+    print_success(f"Renaming complete. {len(mapping)} files were indexed ({len(steps)} renames).")
     pause()
 
 # --- 6. CSV Calculator ---
+def exact_partials(values) -> list:
+    """Returns a few floats whose exact sum is the exact sum of values.
+
+    Built on math.fsum, so sums merged from any number of chunks, in any
+    order, still round to exactly the same final result.
+    """
+    vals = list(values)
+    parts = []
+    try:
+        while True:
+            total = math.fsum(vals)
+            if total == 0:
+                return parts
+            parts.append(total)
+            vals.append(-total)
+    except OverflowError:
+        return [float(sum(vals))]
+
+class ColumnAggregate:
+    """Count, exact sum, min and max of one numeric column; mergeable across chunks."""
+
+    __slots__ = ("count", "partials", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.partials = []
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add_chunk(self, values):
+        """Folds in an array('d') (or a float64 NumPy array) of values."""
+        if not len(values):
+            return
+        if np is not None:
+            vec = values if isinstance(values, np.ndarray) else np.frombuffer(values, dtype=np.float64)
+            lo, hi = float(vec.min()), float(vec.max())
+        else:
+            lo, hi = min(values), max(values)
+        self.count += len(values)
+        self.min = min(self.min, lo)
+        self.max = max(self.max, hi)
+        self.partials = exact_partials(self.partials + exact_partials(values.tolist()))
+
+    def merge(self, other: "ColumnAggregate"):
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.partials = exact_partials(self.partials + other.partials)
+
+    @property
+    def sum(self) -> float:
+        return math.fsum(self.partials)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else math.nan
+
+class CsvAggregator:
+    """Streams CSV rows into array('d') column buffers and folds them into per-group aggregates.
+
+    Memory is bounded by chunk_rows: buffers are reduced and cleared whenever
+    that many rows are waiting. A row is malformed (and skipped) when a selected
+    column is missing or is not a finite number.
+    """
+
+    SAMPLE = 5  # Malformed rows kept for display
+
+    def __init__(self, columns: list, group_col: int = None, chunk_rows: int = 65536, row_writer=None):
+        self.columns = columns
+        self.group_col = group_col
+        self.chunk_rows = chunk_rows
+        self.row_writer = row_writer
+        self.groups = {}   # group key -> [ColumnAggregate per column]
+        self.buffers = {}  # group key -> [array('d') per column]
+        self.out_rows = []
+        self.buffered = 0
+        self.valid = 0
+        self.malformed = 0
+        self.malformed_sample = []
+
+    def feed(self, rows):
+        cols, group_col = self.columns, self.group_col
+        isfinite = math.isfinite
+        for row in rows:
+            try:
+                vals = [float(row[c]) for c in cols]
+                key = row[group_col] if group_col is not None else None
+            except (ValueError, IndexError):
+                vals = None
+            if vals is None or not all(map(isfinite, vals)):
+                self.malformed += 1
+                if len(self.malformed_sample) < self.SAMPLE:
+                    self.malformed_sample.append(row)
+                continue
+
+            bufs = self.buffers.get(key)
+            if bufs is None:
+                bufs = self.buffers[key] = [array("d") for _ in cols]
+            for buf, v in zip(bufs, vals):
+                buf.append(v)
+            if self.row_writer:
+                # Echo the original text, it is cheaper than re-formatting floats
+                total = math.fsum(vals)
+                picked = [row[c] for c in cols]
+                self.out_rows.append(([key] if group_col is not None else []) + picked + [total, total / len(vals)])
+            self.buffered += 1
+            if self.buffered >= self.chunk_rows:
+                self.flush()
+
+    def flush(self):
+        for key, bufs in self.buffers.items():
+            aggs = self.groups.get(key)
+            if aggs is None:
+                aggs = self.groups[key] = [ColumnAggregate() for _ in self.columns]
+            for agg, buf in zip(aggs, bufs):
+                agg.add_chunk(buf)
+        self.valid += self.buffered
+        self.buffers.clear()
+        self.buffered = 0
+        if self.row_writer and self.out_rows:
+            self.row_writer.writerows(self.out_rows)
+            self.out_rows.clear()
+
+    def add_columns(self, key, arrays: list):
+        """Folds in ready-made column arrays for one group (used by the column cache)."""
+        aggs = self.groups.get(key)
+        if aggs is None:
+            aggs = self.groups[key] = [ColumnAggregate() for _ in self.columns]
+        for agg, values in zip(aggs, arrays):
+            agg.add_chunk(values)
+        self.valid += len(arrays[0]) if arrays else 0
+
+    def merge(self, other: "CsvAggregator"):
+        for key, other_aggs in other.groups.items():
+            aggs = self.groups.get(key)
+            if aggs is None:
+                self.groups[key] = other_aggs
+            else:
+                for agg, other_agg in zip(aggs, other_aggs):
+                    agg.merge(other_agg)
+        self.valid += other.valid
+        self.malformed += other.malformed
+        self.malformed_sample = (self.malformed_sample + other.malformed_sample)[:self.SAMPLE]
+
+class ByteRange(io.RawIOBase):
+    """Read-only raw stream over bytes [lo, hi) of a file."""
+
+    def __init__(self, path: str, lo: int, hi: int):
+        super().__init__()
+        self.f = open(path, "rb", buffering=0)
+        self.f.seek(lo)
+        self.left = hi - lo
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self.left <= 0:
+            return 0
+        n = self.f.readinto(memoryview(b)[:min(len(b), self.left)])
+        self.left -= n
+        return n
+
+    def close(self):
+        self.f.close()
+        super().close()
+
+def csv_record_boundaries(path: str, start: int, targets: list) -> list:
+    """For each target offset, finds the next record start (quote-aware).
+
+    A newline ends a record only when the number of '"' seen since `start` is
+    even, which holds for RFC 4180 quoting (quotes inside fields are doubled).
+    The scan only counts bytes, so it runs at close to disk speed.
+    """
+    boundaries = []
+    pending = sorted(t for t in targets if t >= start)
+    block_size = 8 << 20
+    quotes_before = 0
+    offset = start
+    with open(path, "rb") as f:
+        f.seek(start)
+        while pending:
+            data = f.read(block_size)
+            if not data:
+                break
+            while pending and pending[0] < offset + len(data):
+                i = max(pending[0] - offset, 0)
+                while True:
+                    nl = data.find(b"\n", i)
+                    if nl == -1:
+                        break
+                    if (quotes_before + data.count(b'"', 0, nl)) % 2 == 0:
+                        break
+                    i = nl + 1
+                if nl == -1:
+                    pending[0] = offset + len(data)  # Keep looking in the next block
+                    break
+                boundaries.append(offset + nl + 1)
+                pending.pop(0)
+            quotes_before += data.count(b'"')
+            offset += len(data)
+    return boundaries
+
+# A whole RFC 4180 quoted field: opens at a field start, closes at a field end, quotes inside doubled
+CSV_QUOTED_FIELD = re.compile(rb'(?<![^,\n])"[^"]*(?:""[^"]*)*"(?![^,\r\n])')
+
+def csv_quotes_regular(path: str, lo: int, hi: int, block_size: int = 16 << 20) -> bool:
+    """Checks that every '"' in bytes [lo, hi) belongs to a well-formed quoted field.
+
+    When this holds for every range, the quote-parity split points are real
+    record boundaries. A stray quote inside an unquoted field (which csv.reader
+    accepts as a literal) breaks parity, and this returns False.
+    """
+    carry = b""
+    left = hi - lo
+    with open(path, "rb") as f:
+        f.seek(lo)
+        while True:
+            data = f.read(min(block_size, left)) if left > 0 else b""
+            left -= len(data)
+            block = carry + data
+            cut = len(block)
+            if data:
+                # Check up to the last newline outside quotes; the rest waits for the next block
+                cut = block.rfind(b"\n") + 1
+                while cut and block.count(b'"', 0, cut) % 2:
+                    cut = block.rfind(b"\n", 0, cut - 1) + 1
+            if b'"' in CSV_QUOTED_FIELD.sub(b"", block[:cut]):
+                return False
+            if not data:
+                return True
+            carry = block[cut:]
+
+def aggregate_csv_range(path: str, lo: int, hi: int, columns: list, group_col: int, part_path: str = None):
+    """Worker: aggregates the records in bytes [lo, hi) of a CSV file.
+
+    Returns None without parsing when the range has irregular quoting, since
+    then the split points cannot be trusted.
+    """
+    if not csv_quotes_regular(path, lo, hi):
+        return None
+    out_file = open(part_path, "w", newline="", encoding="utf-8") if part_path else None
+    try:
+        agg = CsvAggregator(columns, group_col, row_writer=csv.writer(out_file) if out_file else None)
+        # Same decoding and newline handling as the serial path
+        with io.TextIOWrapper(io.BufferedReader(ByteRange(path, lo, hi), 1 << 20), encoding="utf-8", newline="") as f:
+            agg.feed(csv.reader(f))
+        agg.flush()
+    finally:
+        if out_file:
+            out_file.close()
+    agg.row_writer = None
+    return agg
+
+def aggregate_csv_serial(path: str, has_header: bool, columns: list, group_col: int,
+                         row_writer=None) -> CsvAggregator:
+    """Aggregates a whole CSV file in this process."""
+    agg = CsvAggregator(columns, group_col, row_writer=row_writer)
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        if has_header:
+            next(reader, None)
+        agg.feed(reader)
+    agg.flush()
+    agg.row_writer = None
+    return agg
+
+def aggregate_csv_parallel(path: str, has_header: bool, columns: list, group_col: int,
+                           workers: int, out_path: str = None) -> CsvAggregator:
+    """Splits a CSV into record-aligned byte ranges, aggregates them on a process pool and merges.
+
+    Falls back to a serial pass when a worker finds quoting the split cannot
+    follow, so the result always matches aggregate_csv_serial.
+    """
+    size = os.path.getsize(path)
+    start = 0
+    if has_header:
+        header_end = csv_record_boundaries(path, 0, [0])
+        start = header_end[0] if header_end else size  # Header only, no newline at all
+    parts = workers * 4  # Smaller ranges balance uneven rows between workers
+    targets = [start + (size - start) * i // parts for i in range(1, parts)]
+    bounds = sorted({start, size, *(b for b in csv_record_boundaries(path, start, targets) if b < size)})
+    ranges = list(zip(bounds, bounds[1:]))
+
+    part_paths = [f"{out_path}.part{i}" if out_path else None for i in range(len(ranges))]
+    total = CsvAggregator(columns, group_col)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(aggregate_csv_range, path, lo, hi, columns, group_col, part)
+                       for (lo, hi), part in zip(ranges, part_paths)]
+            # Merge in file order so the malformed-line sample matches the serial path
+            for future in futures:
+                result = future.result()
+                if result is None:
+                    break
+                total.merge(result)
+            else:
+                result = total
+            if result is None:
+                for future in futures:
+                    future.cancel()
+        if result is None:
+            print_info("Irregular quoting found; aggregating serially so the split cannot change the result.")
+            out_file = open(out_path, "a", newline="", encoding="utf-8") if out_path else None
+            try:
+                return aggregate_csv_serial(path, has_header, columns, group_col,
+                                            csv.writer(out_file) if out_file else None)
+            finally:
+                if out_file:
+                    out_file.close()
+        if out_path:
+            with open(out_path, "ab") as out:
+                for part in part_paths:
+                    with open(part, "rb") as f:
+                        shutil.copyfileobj(f, out, 1 << 20)
+    finally:
+        for part in part_paths:
+            if part and os.path.exists(part):
+                os.unlink(part)
+    return total
+
+class CsvColumnCache:
+    """Typed binary column files plus a manifest, kept in the user cache folder per CSV path.
+
+    Numeric columns are stored as raw float64 values with a uint8 "valid" mask,
+    group-by columns as int32 codes plus a label list. The manifest is keyed on
+    the source size, mtime and a hash of its first and last MiB; any change
+    invalidates every column. Columns are added the first time they are asked for.
+    The finished aggregates (exact partial sums included) are kept in the
+    manifest per query, so asking the same question again reads no columns.
+    """
+
+    VERSION = 1
+    CHUNK_ROWS = 1 << 20
+
+    def __init__(self, csv_path: str, has_header: bool):
+        self.csv_path = csv_path
+        self.has_header = has_header
+        digest = hashlib.blake2b(os.path.abspath(csv_path).encode(), digest_size=8).hexdigest()
+        self.dir = get_cache_dir("csv") / digest
+        self.source = self._source_key()
+        self.manifest = self._load_manifest()
+
+    def _source_key(self) -> dict:
+        st = os.stat(self.csv_path)
+        h = hashlib.blake2b(digest_size=16)
+        with open(self.csv_path, "rb") as f:
+            h.update(f.read(1 << 20))
+            if st.st_size > 2 << 20:
+                f.seek(-(1 << 20), os.SEEK_END)
+            h.update(f.read(1 << 20))
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sample_hash": h.hexdigest()}
+
+    def _load_manifest(self):
+        try:
+            manifest = json.loads((self.dir / "manifest.json").read_text())
+        except (OSError, ValueError):
+            return None
+        if (manifest.get("version") != self.VERSION or manifest.get("source") != self.source
+                or manifest.get("has_header") != self.has_header or manifest.get("byteorder") != sys.byteorder):
+            return None
+        return manifest
+
+    def missing(self, columns: list, group_col: int) -> tuple:
+        """Returns the (numeric, group) columns that still have to be parsed."""
+        have_num = set(self.manifest["numeric"]) if self.manifest else set()
+        have_grp = set(self.manifest["groups"]) if self.manifest else set()
+        numeric = sorted({c for c in columns if str(c) not in have_num})
+        groups = [group_col] if group_col is not None and str(group_col) not in have_grp else []
+        return numeric, groups
+
+    def build(self, numeric: list, groups: list):
+        """Parses the CSV once and writes the given columns."""
+        if self.manifest is None:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.manifest = {"version": self.VERSION, "source": self.source, "has_header": self.has_header,
+                             "byteorder": sys.byteorder, "rows": None, "numeric": {}, "groups": {}, "results": {}}
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+        tmp = f".{os.getpid()}.tmp"
+        num_files = {c: (open(self.dir / f"c{c}.f64{tmp}", "wb"), open(self.dir / f"c{c}.ok{tmp}", "wb")) for c in numeric}
+        grp_files = {g: open(self.dir / f"g{g}.i32{tmp}", "wb") for g in groups}
+        labels = {g: {} for g in groups}
+        num_bufs = {c: (array("d"), bytearray()) for c in numeric}
+        grp_bufs = {g: array("i") for g in groups}
+        isfinite = math.isfinite
+
+        def flush():
+            for c, (values, valid) in num_bufs.items():
+                values.tofile(num_files[c][0])
+                num_files[c][1].write(valid)
+                del values[:]
+                valid.clear()
+            for g, codes in grp_bufs.items():
+                codes.tofile(grp_files[g])
+                del codes[:]
+
+        rows = 0
+        try:
+            with open(self.csv_path, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                if self.has_header:
+                    next(reader, None)
+                for row in reader:
+                    for c, (values, valid) in num_bufs.items():
+                        try:
+                            v = float(row[c])
+                            ok = isfinite(v)
+                        except (ValueError, IndexError):
+                            v, ok = 0.0, False
+                        values.append(v)
+                        valid.append(ok)
+                    for g, codes in grp_bufs.items():
+                        if g < len(row):
+                            codes.append(labels[g].setdefault(row[g], len(labels[g])))
+                        else:
+                            codes.append(-1)  # Missing group column: a malformed row
+                    rows += 1
+                    if rows % self.CHUNK_ROWS == 0:
+                        flush()
+            flush()
+        finally:
+            for fv, fo in num_files.values():
+                fv.close()
+                fo.close()
+            for fg in grp_files.values():
+                fg.close()
+
+        for c in numeric:
+            os.replace(self.dir / f"c{c}.f64{tmp}", self.dir / f"c{c}.f64")
+            os.replace(self.dir / f"c{c}.ok{tmp}", self.dir / f"c{c}.ok")
+            self.manifest["numeric"][str(c)] = {"values": f"c{c}.f64", "valid": f"c{c}.ok"}
+        for g in groups:
+            os.replace(self.dir / f"g{g}.i32{tmp}", self.dir / f"g{g}.i32")
+            (self.dir / f"g{g}.labels.json").write_text(json.dumps(list(labels[g])))
+            self.manifest["groups"][str(g)] = {"codes": f"g{g}.i32", "labels": f"g{g}.labels.json"}
+        self.manifest["rows"] = rows
+        write_file_atomic(self.dir / "manifest.json", json.dumps(self.manifest, indent=1).encode())
+
+    def _map(self, name: str, fmt: str):
+        """Memory-maps one column file as a NumPy array, or a typed memoryview without NumPy."""
+        path = self.dir / name
+        if np is not None:
+            return np.memmap(path, dtype={"d": np.float64, "B": np.uint8, "i": np.int32}[fmt], mode="r")
+        with open(path, "rb") as f:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast(fmt)
+
+    def aggregate(self, columns: list, group_col: int) -> "CsvAggregator":
+        """Answers an aggregate query from the saved result, or from the mapped columns and saves it."""
+        key = f"{','.join(map(str, columns))}|{group_col}"
+        saved = self.manifest.setdefault("results", {}).get(key)
+        if saved is not None:
+            agg = CsvAggregator(columns, group_col)
+            for group, stats in saved["groups"]:
+                aggs = agg.groups[group] = [ColumnAggregate() for _ in columns]
+                for col_agg, (count, partials, lo, hi) in zip(aggs, stats):
+                    col_agg.count, col_agg.partials, col_agg.min, col_agg.max = count, partials, lo, hi
+            agg.valid, agg.malformed = saved["valid"], saved["malformed"]
+            return agg
+        agg = self._aggregate_columns(columns, group_col)
+        self.manifest["results"][key] = {
+            "valid": agg.valid, "malformed": agg.malformed,
+            "groups": [[group, [[a.count, a.partials, a.min, a.max] for a in aggs]]
+                       for group, aggs in agg.groups.items()]}
+        write_file_atomic(self.dir / "manifest.json", json.dumps(self.manifest, indent=1).encode())
+        return agg
+
+    def _aggregate_columns(self, columns: list, group_col: int) -> "CsvAggregator":
+        """Aggregates the mapped columns, a chunk of rows at a time."""
+        agg = CsvAggregator(columns, group_col)
+        rows = self.manifest["rows"]
+        if not rows:
+            return agg
+        values = [self._map(self.manifest["numeric"][str(c)]["values"], "d") for c in columns]
+        masks = [self._map(self.manifest["numeric"][str(c)]["valid"], "B") for c in columns]
+        codes = labels = None
+        if group_col is not None:
+            entry = self.manifest["groups"][str(group_col)]
+            codes = self._map(entry["codes"], "i")
+            labels = json.loads((self.dir / entry["labels"]).read_text())
+
+        for lo in range(0, rows, self.CHUNK_ROWS):
+            hi = min(rows, lo + self.CHUNK_ROWS)
+            if np is not None:
+                ok = np.ones(hi - lo, dtype=bool)
+                for m in masks:
+                    ok &= m[lo:hi].astype(bool)
+                if codes is not None:
+                    ok &= codes[lo:hi] >= 0
+                picked = [v[lo:hi][ok] for v in values]
+                if codes is None:
+                    agg.add_columns(None, picked)
+                    continue
+                chunk_codes = codes[lo:hi][ok]
+                order = np.argsort(chunk_codes, kind="stable")
+                sorted_codes = chunk_codes[order]
+                picked = [p[order] for p in picked]
+                cuts = [0, *(np.flatnonzero(np.diff(sorted_codes)) + 1).tolist(), len(sorted_codes)]
+                for a, b in zip(cuts, cuts[1:]):
+                    if a < b:
+                        agg.add_columns(labels[int(sorted_codes[a])], [p[a:b] for p in picked])
+            else:
+                combined = int.from_bytes(masks[0][lo:hi], "little")
+                for m in masks[1:]:
+                    combined &= int.from_bytes(m[lo:hi], "little")
+                ok = combined.to_bytes(hi - lo, "little")
+                if codes is None:
+                    agg.add_columns(None, [array("d", compress(v[lo:hi], ok)) for v in values])
+                    continue
+                buckets = {}
+                for code, *vals in zip(compress(codes[lo:hi], ok), *(compress(v[lo:hi], ok) for v in values)):
+                    if code < 0:
+                        continue
+                    bufs = buckets.get(code)
+                    if bufs is None:
+                        bufs = buckets[code] = [array("d") for _ in values]
+                    for buf, v in zip(bufs, vals):
+                        buf.append(v)
+                for code, bufs in buckets.items():
+                    agg.add_columns(labels[code], bufs)
+        agg.malformed = rows - agg.valid
+        return agg
+
+def resolve_csv_column(spec: str, header: list) -> int:
+    """Turns a 1-based column number or a header name into a 0-based index."""
+    spec = spec.strip()
+    if spec.isdigit() and int(spec) > 0:
+        return int(spec) - 1
+    if header and spec in header:
+        return header.index(spec)
+    raise ValueError(f"unknown column '{spec}'")
+
+def print_csv_summary(agg: CsvAggregator, names: list, group_name: str = None, limit: int = 50):
+    """Prints the aggregate table, one line per (group, column)."""
+    width = max([len(n) for n in names] + [6])
+    print(f"{CYAN}{'Group':<20} {'Column':<{width}} {'Count':>10} {'Sum':>16} {'Mean':>14} {'Min':>14} {'Max':>14}{NC}")
+    groups = sorted(agg.groups.items(), key=lambda kv: (-kv[1][0].count, str(kv[0])))
+    for key, aggs in groups[:limit]:
+        label = "(all rows)" if group_name is None else str(key)[:20]
+        for name, a in zip(names, aggs):
+            print(f"{label:<20} {name:<{width}} {a.count:>10} {GREEN}{a.sum:>16.2f}{NC} "
+                  f"{YELLOW}{a.mean:>14.2f}{NC} {a.min:>14.2f} {a.max:>14.2f}")
+            label = ""
+    if len(groups) > limit:
+        print_info(f"... {len(groups) - limit} more groups not shown (largest groups first).")
+
+def run_csv_aggregation(csv_file: Path, has_header: bool):
+    """The Calculator's aggregate mode: streamed column statistics instead of per-row output."""
+    try:
+        with open(csv_file, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), None) if has_header else None
+    except OSError as e:
+        print_error(f"Could not read '{csv_file}': {e}")
+        return
+    if header:
+        print_info(f"Columns: {', '.join(f'{i}={name}' for i, name in enumerate(header, 1))}")
+
+    columns_str = input("Columns to aggregate (names or numbers, comma-separated; default: 3,4): ") or "3,4"
+    group_str = input("Group by column (name or number, blank for none): ")
+    out_str = input("Write per-row results to a CSV file (path, blank to skip): ")
+    workers_str = input(f"Worker processes (default: {os.cpu_count() or 1}, 1 = single process): ") or str(os.cpu_count() or 1)
+    use_cache = input("Use the binary column cache for repeat queries? (y/n, default: n): ").lower() == 'y'
+
+    if not workers_str.isdigit() or int(workers_str) < 1:
+        print_error("Invalid input. Workers must be a positive number. Aborting.")
+        return
+    workers = int(workers_str)
+
+    try:
+        columns = [resolve_csv_column(c, header) for c in columns_str.split(",")]
+        group_col = resolve_csv_column(group_str, header) if group_str.strip() else None
+    except ValueError as e:
+        print_error(f"Invalid column selection: {e}. Aborting.")
+        return
+    names = [header[c] if header and c < len(header) else f"col{c + 1}" for c in columns]
+    group_name = None
+    if group_col is not None:
+        group_name = header[group_col] if header and group_col < len(header) else f"col{group_col + 1}"
+
+    if use_cache and out_str:
+        print_info("The column cache only stores numbers; per-row output needs a full parse.")
+        use_cache = False
+    if use_cache:
+        start = time.perf_counter()
+        cache = CsvColumnCache(str(csv_file), has_header)
+        numeric, groups = cache.missing(columns, group_col)
+        if numeric or groups:
+            print_info(f"Building the column cache in '{cache.dir}'...")
+            cache.build(numeric, groups)
+        else:
+            print_info(f"Answering from the column cache in '{cache.dir}'.")
+        agg = cache.aggregate(columns, group_col)
+        elapsed = time.perf_counter() - start
+        print_separator()
+        print_csv_summary(agg, names, group_name)
+        print_separator()
+        if agg.malformed:
+            print_info(f"Skipped {agg.malformed} malformed lines.")
+        print_success(f"Calculation complete. Processed {agg.valid} valid lines in {elapsed:.3f}s.")
+        return
+
+    print_info(f"Aggregating '{csv_file}' with {workers} process(es){' (NumPy)' if np is not None else ''}...")
+    start = time.perf_counter()
+    out_path = str(Path(out_str).expanduser()) if out_str else None
+    out_file = open(out_path, "w", newline="", encoding="utf-8") if out_path else None
+    try:
+        writer = None
+        if out_file:
+            writer = csv.writer(out_file)
+            writer.writerow(([group_name] if group_name else []) + names + ["total", "average"])
+        if workers > 1:
+            if out_file:
+                out_file.close()  # The workers' part files are appended after the header
+            agg = aggregate_csv_parallel(str(csv_file), has_header, columns, group_col, workers, out_path)
+        else:
+            agg = aggregate_csv_serial(str(csv_file), has_header, columns, group_col, writer)
+    finally:
+        if out_file:
+            out_file.close()
+    elapsed = time.perf_counter() - start
+
+    print_separator()
+    print_csv_summary(agg, names, group_name)
+    print_separator()
+    for row in agg.malformed_sample:
+        print_info(f"Skipping malformed line: {row}")
+    if agg.malformed > len(agg.malformed_sample):
+        print_info(f"... {agg.malformed - len(agg.malformed_sample)} more malformed lines skipped.")
+    if out_file:
+        print_info(f"Per-row results written to '{out_str}'.")
+    rows = agg.valid + agg.malformed
+    print_success(f"Calculation complete. Processed {agg.valid} valid lines "
+                  f"in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec).")
+
 def run_csv_calculator():
     print_header("CSV Calculator")
     
@@ -386,12 +2574,21 @@ def run_csv_calculator():
     
     csv_file_str = input("Enter the path to your CSV file: ")
     has_header_str = input("Does this file have a header row? (y/n): ").lower()
+    mode = input("Show (r)ow-by-row results or an (a)ggregate summary? (default: r): ").lower()
 
     csv_file = Path(csv_file_str).expanduser()
 
     if not csv_file.is_file():
         print_error(f"File not found: '{csv_file}'. Aborting.")
         return
+
+    if mode == "a":
+        try:
+            run_csv_aggregation(csv_file, has_header_str == 'y')
+        except OSError as e:
+            print_error(f"An error occurred: {e}")
+        pause()
+        return
     
     print_info(f"Parsing '{csv_file}'...")
     print_separator()
@@ -580,10 +2777,603 @@ def run_image_extractor():
     pause()
 
 # --- 9. TarBall Mailer (Backup & Notify) ---
+class ParallelGzipWriter(io.RawIOBase):
+    """A write-only file that gzips fixed-size blocks on a thread pool, pigz-style.
+
+    Each block becomes its own complete gzip member and members are written
+    in order, so the output is a standard multi-member .gz file that gzip and
+    tar read as one stream. zlib releases the GIL while compressing, so plain
+    threads use every core. At most two blocks per worker are held in memory.
+    """
+
+    def __init__(self, path: Path, workers: int = None, block_size: int = 1 << 20, level: int = 6):
+        super().__init__()
+        self.out = open(path, "wb")
+        self.workers = workers or os.cpu_count() or 1
+        self.block_size = block_size
+        self.level = level
+        self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        self.pending = deque()
+        self.buffer = bytearray()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def _submit(self, block: bytes):
+        self.bytes_in += len(block)
+        self.pending.append(self.pool.submit(gzip.compress, block, self.level, mtime=0))
+        while len(self.pending) > self.workers * 2:
+            self._write_next()
+
+    def _write_next(self):
+        member = self.pending.popleft().result()
+        self.out.write(member)
+        self.bytes_out += len(member)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.buffer or not self.bytes_in:
+                self._submit(bytes(self.buffer))  # An empty input still needs one member
+                self.buffer.clear()
+            while self.pending:
+                self._write_next()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            self.out.close()
+            super().close()
+
+def create_parallel_targz(src_dir: Path, archive_path: Path, workers: int, block_size: int, level: int,
+                          files: list = None, extra: dict = None) -> dict:
+    """Writes src_dir (as its own top-level folder) to a .tar.gz compressed in parallel.
+
+    With files, only those paths (relative to src_dir) are archived. extra maps
+    member names to bytes added at the top level of the archive.
+    """
+    start = time.perf_counter()
+    writer = ParallelGzipWriter(archive_path, workers, block_size, level)
+    try:
+        with tarfile.open(fileobj=writer, mode="w|", bufsize=block_size) as tar:
+            if files is None:
+                tar.add(str(src_dir), arcname=src_dir.name)
+            else:
+                for rel in files:
+                    tar.add(str(src_dir / rel), arcname=f"{src_dir.name}/{rel}", recursive=False)
+            for name, data in (extra or {}).items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                tar.addfile(info, io.BytesIO(data))
+    finally:
+        writer.close()
+    return {"bytes_in": writer.bytes_in, "bytes_out": writer.bytes_out, "seconds": time.perf_counter() - start}
+
+BACKUP_MANIFEST_SUFFIX = ".manifest.json"
+BACKUP_DELETIONS_MEMBER = ".backup-deletions.json"
+BACKUP_MANIFEST_KEYS = frozenset({"name", "kind", "base", "source", "folder", "created", "archive", "files"})
+
+def load_backup_manifests(dest_dir: Path, src_dir: Path = None) -> list:
+    """Returns the backup manifests in dest_dir (optionally for one source), oldest first."""
+    manifests = []
+    for path in dest_dir.glob(f"*{BACKUP_MANIFEST_SUFFIX}"):
+        try:
+            manifest = json.loads(path.read_text())
+            missing = BACKUP_MANIFEST_KEYS.difference(manifest)
+            if missing:
+                raise ValueError(f"missing {', '.join(sorted(missing))}")
+        except (OSError, ValueError, TypeError) as e:
+            print_error(f"Skipping unreadable backup manifest '{path.name}': {e}")
+            continue
+        if src_dir is None or manifest.get("source") == str(src_dir.resolve()):
+            manifests.append(manifest)
+    return sorted(manifests, key=lambda m: m["created"])
+
+def scan_backup_source(src_dir: Path, previous: dict, use_hash: bool) -> dict:
+    """Returns {relative path: [size, mtime_ns, hash or None]} for every file under src_dir.
+
+    Hashes are only computed for files whose size or mtime moved since previous;
+    without hashing, those files are still opened once to check they can be read.
+    A file that cannot be read keeps its previous entry, so it is neither sent
+    nor recorded as deleted; a new unreadable file or folder fails the backup.
+    """
+    def unreadable(path, e):
+        raise OSError(f"Could not scan '{path}': {e}")
+
+    files = {}
+    root = str(src_dir)
+    for path, size, mtime_ns in iter_search_files(root, use_ignore=False, on_error=unreadable):
+        rel = os.path.relpath(path, root).replace(os.sep, "/")
+        old = previous.get(rel)
+        digest = None
+        moved = not old or old[0] != size or old[1] != mtime_ns
+        try:
+            if use_hash:
+                digest = hash_file_full(path, 1 << 20) if moved or not old[2] else old[2]
+            elif moved:
+                with open(path, "rb"):
+                    pass  # Not hashed, but it is about to be archived: it must open
+        except OSError as e:
+            if not old:
+                raise OSError(f"Could not read '{path}': {e}") from e
+            print_error(f"Could not read '{rel}' ({e}); keeping its previous backup.")
+            files[rel] = old
+            continue
+        files[rel] = [size, mtime_ns, digest]
+    return files
+
+def diff_backup_files(files: dict, base: dict) -> tuple:
+    """Returns (new or changed paths, deleted paths) between a scan and a base manifest's files."""
+    changed = []
+    for rel, (size, mtime_ns, digest) in files.items():
+        old = base.get(rel)
+        if old is None:
+            changed.append(rel)
+        elif digest and old[2]:
+            if digest != old[2]:
+                changed.append(rel)  # With hashes, a touched but identical file is not re-sent
+        elif (size, mtime_ns) != (old[0], old[1]):
+            changed.append(rel)
+    deleted = sorted(rel for rel in base if rel not in files)
+    return sorted(changed), deleted
+
+def backup_chain(manifests: list, target: dict) -> list:
+    """Returns the manifests to replay for target: its full backup first, target last."""
+    by_name = {m["name"]: m for m in manifests}
+    chain = [target]
+    while chain[-1]["kind"] != "full":
+        base = by_name.get(chain[-1]["base"])
+        if base is None:
+            raise ValueError(f"Backup '{chain[-1]['base']}' needed by '{chain[-1]['name']}' is missing")
+        chain.append(base)
+    return chain[::-1]
+
+def restore_backup(dest_dir: Path, manifests: list, target: dict, restore_dir: Path) -> int:
+    """Rebuilds the source as it was at target under restore_dir. Returns the file count."""
+    chain = backup_chain(manifests, target)
+    extract_kwargs = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+    root = restore_dir / target["folder"]
+    prefix = target["folder"] + "/"
+    written = set()  # Only files the chain itself extracted are ever removed again
+    for manifest in chain:
+        print_info(f"Applying {manifest['kind']} backup '{manifest['archive']}'...")
+        with tarfile.open(dest_dir / manifest["archive"], "r:gz") as tar:
+            members = [m for m in tar.getmembers() if m.name != BACKUP_DELETIONS_MEMBER]
+            tar.extractall(restore_dir, members=members, **extract_kwargs)
+        written.update(m.name[len(prefix):] for m in members if not m.isdir() and m.name.startswith(prefix))
+        for rel in manifest.get("deleted", []):
+            if rel in written:
+                written.discard(rel)
+                try:
+                    os.unlink(root / rel)
+                except FileNotFoundError:
+                    pass
+    # Whatever the chain left behind that the target never had goes too
+    keep = target["files"]
+    for rel in written.difference(keep):
+        try:
+            os.unlink(root / rel)
+        except FileNotFoundError:
+            pass
+    return len(keep)
+
+def run_backup_restore():
+    dest_dir = Path(input("Enter the backup DESTINATION directory to restore from: ")).expanduser()
+    manifests = load_backup_manifests(dest_dir) if dest_dir.is_dir() else []
+    if not manifests:
+        print_error(f"No backups with manifests found in '{dest_dir}'.")
+        return
+    for i, m in enumerate(manifests, 1):
+        print(f"{i:>3}. {m['created'][:19]}  {m['kind']:<12} {m['folder']:<20} {len(m['files'])} files")
+    choice = input("Restore which backup (number)? ")
+    if not choice.isdigit() or not 1 <= int(choice) <= len(manifests):
+        print_error("Invalid choice. Aborting.")
+        return
+    target = manifests[int(choice) - 1]
+    restore_dir = Path(input("Restore into which directory (must not already hold that folder)? ")).expanduser()
+    if (restore_dir / target["folder"]).exists():
+        print_error(f"'{restore_dir / target['folder']}' already exists. Aborting.")
+        return
+    try:
+        restore_dir.mkdir(parents=True, exist_ok=True)
+        count = restore_backup(dest_dir, manifests, target, restore_dir)
+    except (OSError, ValueError, tarfile.TarError) as e:
+        print_error(f"Restore FAILED: {e}")
+        return
+    print_success(f"Restored {count} files to '{restore_dir / target['folder']}' as of {target['created'][:19]}.")
+
+CHUNK_MIN = 16 << 10
+CHUNK_AVG_BITS = 16          # Cut where the low 16 bits of the gear hash are zero: ~64 KiB chunks
+CHUNK_MAX = 256 << 10
+CHUNK_MASK = (1 << CHUNK_AVG_BITS) - 1
+GEAR = [int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=4).digest(), "little") for i in range(256)]
+GEAR_LOW = bytes(g & 0xFF for g in GEAR)           # bytes.translate tables for the NumPy-free path
+GEAR_HIGH = bytes(g >> 8 & 0xFF for g in GEAR)
+GEAR_SEGMENT = 1 << 20
+
+def gear_candidates(data: bytes, start: int = 0) -> list:
+    """Returns the offsets i >= start whose gear hash ends a chunk ((h & CHUNK_MASK) == 0).
+
+    The gear hash is h = (h << 1) + GEAR[byte] over 32 bits, so its low
+    CHUNK_AVG_BITS bits depend only on that many trailing bytes. That makes cut
+    points purely content-defined and lets them all be computed at once.
+    """
+    if np is not None:
+        table = np.array(GEAR, dtype=np.uint32)
+        view = np.frombuffer(data, dtype=np.uint8)
+        lo = max(0, start - CHUNK_AVG_BITS + 1)
+        gears = table[view[lo:]]
+        acc = gears.copy()
+        for k in range(1, CHUNK_AVG_BITS):
+            acc[k:] += gears[:-k] << np.uint32(k)
+        hits = np.flatnonzero((acc & np.uint32(CHUNK_MASK)) == 0) + lo
+        return hits[hits >= start].tolist()
+    # Without NumPy, the same sum runs on one big int holding a 32-bit lane per
+    # byte: the 16 terms of at most 16 bits shifted by up to 15 add up to less
+    # than 2**32, so no lane carries into the next.
+    hits = []
+    for seg in range(start, len(data), GEAR_SEGMENT):
+        lo = max(0, seg - CHUNK_AVG_BITS + 1)
+        window = data[lo:seg + GEAR_SEGMENT]
+        lanes = bytearray(4 * len(window))
+        lanes[0::4] = window.translate(GEAR_LOW)
+        lanes[1::4] = window.translate(GEAR_HIGH)
+        acc = int.from_bytes(lanes, "little")
+        shift = 33  # One lane over and one bit up; doubling gives all 16 terms in 4 steps
+        for _ in range(4):
+            acc += acc << shift
+            shift *= 2
+        out = acc.to_bytes((acc.bit_length() + 7) // 8, "little")[:len(lanes)]
+        low16 = int.from_bytes(out[0::4], "little") | int.from_bytes(out[1::4], "little")
+        zero = low16.to_bytes(len(window), "little")  # A 0 byte where the lane's low 16 bits are 0
+        i = zero.find(0, seg - lo)
+        while i >= 0:
+            hits.append(lo + i)
+            i = zero.find(0, i + 1)
+    return hits
+
+def iter_file_chunks(path: str, read_size: int = 8 << 20):
+    """Yields the content-defined chunks of a file, between CHUNK_MIN and CHUNK_MAX bytes."""
+    with open(path, "rb") as f:
+        buf = b""
+        eof = False
+        while not eof:
+            data = f.read(read_size)
+            eof = not data
+            buf += data
+            pos = 0
+            # Only look for cuts at least CHUNK_MIN into each chunk; before that none may fall
+            hits = iter(gear_candidates(buf, CHUNK_MIN - 1))
+            hit = next(hits, None)
+            while True:
+                limit = pos + CHUNK_MAX
+                while hit is not None and hit < pos + CHUNK_MIN - 1:
+                    hit = next(hits, None)
+                if hit is not None and hit < limit:
+                    cut = hit + 1
+                elif len(buf) >= limit:
+                    cut = limit
+                else:
+                    break  # The rest may still grow into a chunk; wait for more data
+                yield buf[pos:cut]
+                pos = cut
+            buf = buf[pos:]
+            if eof and buf:
+                yield buf
+
+class ChunkStore:
+    """A deduplicating backup store: zlib-compressed chunks named by their blake2b hash.
+
+    Layout under root: chunks/ab/<hash> for the data and snapshots/<name>.json.gz
+    for each snapshot's index (per file: size, mtime, mode and chunk list). A
+    lock file serializes snapshots against garbage collection.
+    """
+
+    def __init__(self, root: Path, level: int = 6):
+        self.root = root
+        self.level = level
+        (root / "chunks").mkdir(parents=True, exist_ok=True)
+        (root / "snapshots").mkdir(parents=True, exist_ok=True)
+        self.lock_fd = os.open(root / "lock", os.O_RDWR | os.O_CREAT, 0o644)
+
+    def lock(self):
+        fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+
+    def unlock(self):
+        fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+    def close(self):
+        os.close(self.lock_fd)
+
+    def chunk_path(self, digest: str) -> Path:
+        return self.root / "chunks" / digest[:2] / digest[2:]
+
+    def put(self, chunk: bytes) -> tuple:
+        """Stores a chunk unless it is already there. Returns (digest, bytes newly stored)."""
+        digest = hashlib.blake2b(chunk, digest_size=32).hexdigest()
+        path = self.chunk_path(digest)
+        if path.exists():
+            return digest, 0
+        path.parent.mkdir(exist_ok=True)
+        data = zlib.compress(chunk, self.level)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return digest, len(data)
+
+    def get(self, digest: str) -> bytes:
+        chunk = zlib.decompress(self.chunk_path(digest).read_bytes())
+        if hashlib.blake2b(chunk, digest_size=32).hexdigest() != digest:
+            raise ValueError(f"Chunk {digest} is corrupt")
+        return chunk
+
+    def snapshots(self, strict: bool = False) -> list:
+        """Returns every snapshot index, oldest first.
+
+        Unreadable indexes are skipped with an error, or raise ValueError when
+        strict is set: garbage collection must not treat their chunks as dead.
+        """
+        found = []
+        for path in (self.root / "snapshots").glob("*.json.gz"):
+            try:
+                found.append(json.loads(gzip.decompress(path.read_bytes())))
+            except (OSError, ValueError, EOFError) as e:
+                if strict:
+                    raise ValueError(f"snapshot index '{path.name}' is unreadable ({e}); "
+                                     "nothing was removed") from e
+                print_error(f"Skipping unreadable snapshot index '{path.name}'.")
+        return sorted(found, key=lambda s: s["created"])
+
+    def save_snapshot(self, snapshot: dict):
+        path = self.root / "snapshots" / f"{snapshot['name']}.json.gz"
+        write_file_atomic(path, gzip.compress(json.dumps(snapshot).encode()))
+
+    def delete_snapshot(self, name: str):
+        self.lock()
+        try:
+            (self.root / "snapshots" / f"{name}.json.gz").unlink()
+        finally:
+            self.unlock()
+
+    def _store_file(self, path: str, pool: ThreadPoolExecutor, window: int, stats: dict) -> list:
+        """Chunks one file into the store and returns its chunk list.
+
+        At most window chunks are queued at once, so a huge file never sits in memory whole.
+        """
+        chunks = []
+        queued = deque()
+
+        def collect(future):
+            digest, stored = future.result()
+            chunks.append(digest)
+            stats["new_chunks"] += stored > 0
+            stats["stored"] += stored
+
+        for chunk in iter_file_chunks(path):
+            queued.append(pool.submit(self.put, chunk))
+            if len(queued) >= window:
+                collect(queued.popleft())
+        while queued:
+            collect(queued.popleft())
+        return chunks
+
+    def snapshot(self, src_dir: Path, workers: int = 4) -> dict:
+        """Chunks every file under src_dir into the store and records a snapshot.
+
+        Files whose size and mtime match the previous snapshot of the same
+        source reuse its chunk list without being read. Folders (empty ones
+        included) and symlinks are recorded too; sockets and FIFOs are skipped
+        and counted.
+        """
+        self.lock()
+        try:
+            source = str(src_dir.resolve())
+            previous = next((s for s in reversed(self.snapshots()) if s["source"] == source), None)
+            old_files = previous["files"] if previous else {}
+            files, dirs, links = {}, {}, {}
+            stats = {"files": 0, "bytes": 0, "read": 0, "chunks": 0, "new_chunks": 0, "stored": 0,
+                     "dirs": 0, "links": 0, "skipped": 0}
+            root = str(src_dir)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for current, dirnames, filenames in os.walk(root, onerror=lambda e: print_error(f"Skipped: {e}")):
+                    for name in dirnames + filenames:
+                        path = os.path.join(current, name)
+                        rel = os.path.relpath(path, root).replace(os.sep, "/")
+                        try:
+                            st = os.lstat(path)
+                            if stat.S_ISLNK(st.st_mode):
+                                links[rel] = os.readlink(path)
+                                continue
+                            if stat.S_ISDIR(st.st_mode):
+                                dirs[rel] = stat.S_IMODE(st.st_mode)
+                                continue
+                            if not stat.S_ISREG(st.st_mode):
+                                stats["skipped"] += 1
+                                continue
+                            size, mtime_ns = st.st_size, st.st_mtime_ns
+                            old = old_files.get(rel)
+                            if old and old["size"] == size and old["mtime_ns"] == mtime_ns:
+                                chunks = old["chunks"]
+                            else:
+                                chunks = self._store_file(path, pool, workers * 2, stats)
+                                stats["read"] += size
+                        except OSError as e:
+                            print_error(f"Skipped '{path}': {e}")
+                            stats["skipped"] += 1
+                            continue
+                        files[rel] = {"size": size, "mtime_ns": mtime_ns, "mode": stat.S_IMODE(st.st_mode),
+                                      "chunks": chunks}
+                        stats["files"] += 1
+                        stats["bytes"] += size
+                        stats["chunks"] += len(chunks)
+            stats["dirs"], stats["links"] = len(dirs), len(links)
+            name = base = f"{src_dir.name}_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}"
+            while (self.root / "snapshots" / f"{name}.json.gz").exists():
+                name = f"{base}_{secrets.token_hex(2)}"
+            self.save_snapshot({"version": 1, "name": name, "source": source, "folder": src_dir.name,
+                                "created": datetime.now().isoformat(), "files": files,
+                                "dirs": dirs, "links": links, "stored": stats["stored"]})
+            stats["name"] = name
+            return stats
+        finally:
+            self.unlock()
+
+    def restore(self, snapshot: dict, restore_dir: Path) -> tuple:
+        """Recreates a snapshot under restore_dir/<folder>. Returns (files, folders, symlinks)."""
+        root = restore_dir / snapshot["folder"]
+        root.mkdir(parents=True, exist_ok=True)
+        dirs = snapshot.get("dirs", {})
+        for rel in sorted(dirs):
+            (root / rel).mkdir(parents=True, exist_ok=True)
+        for rel, meta in snapshot["files"].items():
+            target = root / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(f".{target.name}.part")
+            with open(tmp, "wb") as f:
+                for digest in meta["chunks"]:
+                    f.write(self.get(digest))
+            os.chmod(tmp, meta["mode"])
+            os.replace(tmp, target)
+            os.utime(target, ns=(meta["mtime_ns"], meta["mtime_ns"]))
+        links = snapshot.get("links", {})
+        for rel, link_target in links.items():
+            target = root / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # Made under a temporary name and moved over, so restoring again replaces the old link
+            tmp = target.with_name(f".{target.name}.part")
+            if os.path.lexists(tmp):
+                os.unlink(tmp)
+            os.symlink(link_target, tmp)
+            os.replace(tmp, target)
+        # Modes last, so a read-only folder does not block restoring its contents
+        for rel in sorted(dirs, reverse=True):
+            os.chmod(root / rel, dirs[rel])
+        return len(snapshot["files"]), len(dirs), len(links)
+
+    def gc(self) -> tuple:
+        """Deletes chunks no snapshot refers to. Returns (chunks removed, bytes freed).
+
+        Raises ValueError, before deleting anything, if a snapshot index cannot be read.
+        """
+        self.lock()
+        try:
+            live = {digest for snap in self.snapshots(strict=True)
+                    for meta in snap["files"].values() for digest in meta["chunks"]}
+            removed = freed = 0
+            for entry in iter_dir_files(str(self.root / "chunks"), recursive=True):
+                digest = os.path.basename(os.path.dirname(entry.path)) + entry.name
+                if digest in live or entry.name.startswith("."):
+                    continue
+                try:
+                    freed += entry.stat().st_size
+                    os.unlink(entry.path)
+                    removed += 1
+                except OSError as e:
+                    print_error(f"Could not remove chunk '{entry.path}': {e}")
+            return removed, freed
+        finally:
+            self.unlock()
+
+def run_chunk_store():
+    store_str = input("Enter the chunk store directory (created if missing): ")
+    action = input("(s)napshot a folder, (l)ist snapshots, (r)estore, (d)elete a snapshot, or (g)arbage-collect? "
+                   "(default: s): ").lower() or 's'
+    try:
+        store = ChunkStore(Path(store_str).expanduser())
+    except OSError as e:
+        print_error(f"Cannot open chunk store '{store_str}': {e}")
+        return
+
+    try:
+        if action == 's':
+            src_dir = Path(input("Enter the full path of the SOURCE directory to backup: ")).expanduser()
+            if not src_dir.is_dir():
+                print_error(f"Source directory '{src_dir}' does not exist. Aborting.")
+                return
+            workers_str = input(f"Threads (default: {os.cpu_count() or 1}): ") or str(os.cpu_count() or 1)
+            workers = max(1, int(workers_str)) if workers_str.isdigit() else 1
+            print_info(f"Snapshotting '{src_dir}' into '{store.root}'"
+                       f"{' (NumPy chunker)' if np is not None else ''}...")
+            start = time.perf_counter()
+            stats = store.snapshot(src_dir, workers)
+            elapsed = time.perf_counter() - start
+            print_info(f"{stats['files']} files, {format_size(stats['bytes'])}: read {format_size(stats['read'])}, "
+                       f"{stats['new_chunks']} of {stats['chunks']} chunks new, "
+                       f"{format_size(stats['stored'])} added to the store in {elapsed:.1f}s.")
+            print_info(f"Also recorded {stats['dirs']} folders and {stats['links']} symlinks.")
+            if stats["skipped"]:
+                print_error(f"{stats['skipped']} entries (unreadable files, sockets, FIFOs) were not saved.")
+            print_success(f"Snapshot '{stats['name']}' saved.")
+        elif action == 'l':
+            snapshots = store.snapshots()
+            if not snapshots:
+                print_info("The store has no snapshots yet.")
+            for snap in snapshots:
+                size = sum(meta["size"] for meta in snap["files"].values())
+                print(f"{snap['name']:<40} {snap['created'][:19]}  {len(snap['files']):>7} files  "
+                      f"{format_size(size):>10}  +{format_size(snap.get('stored', 0))} stored")
+        elif action in ('r', 'd'):
+            snapshots = store.snapshots()
+            if not snapshots:
+                print_info("The store has no snapshots yet.")
+                return
+            for i, snap in enumerate(snapshots, 1):
+                print(f"{i:>3}. {snap['name']}")
+            choice = input("Which snapshot (number)? ")
+            if not choice.isdigit() or not 1 <= int(choice) <= len(snapshots):
+                print_error("Invalid choice. Aborting.")
+                return
+            snap = snapshots[int(choice) - 1]
+            if action == 'd':
+                store.delete_snapshot(snap["name"])
+                print_success(f"Snapshot '{snap['name']}' deleted. Run a garbage collection to free its chunks.")
+                return
+            restore_dir = Path(input("Restore into which directory? ")).expanduser()
+            if (restore_dir / snap["folder"]).exists():
+                print_error(f"'{restore_dir / snap['folder']}' already exists. Aborting.")
+                return
+            files, dirs, links = store.restore(snap, restore_dir)
+            print_success(f"Restored {files} files, {dirs} folders and {links} symlinks "
+                          f"to '{restore_dir / snap['folder']}'.")
+        elif action == 'g':
+            removed, freed = store.gc()
+            print_success(f"Removed {removed} unreferenced chunks, freeing {format_size(freed)}.")
+        else:
+            print_error("Invalid choice.")
+    except (OSError, ValueError, zlib.error) as e:
+        print_error(f"Chunk store operation FAILED: {e}")
+    finally:
+        store.close()
+
 def run_tarball_mailer():
     print_header("TarBall Mailer (Backup & Notify)")
+
+    kind = {'f': "full", 'i': "incremental", 'd': "differential", 'r': "restore", 'c': "chunks"}.get(
+        input("Make a (f)ull, (i)ncremental or (d)ifferential backup, (r)estore one, "
+              "or use a deduplicating (c)hunk store? (default: f): ").lower() or 'f')
+    if kind is None:
+        print_error("Invalid choice. Aborting.")
+        return
+    if kind == "restore":
+        run_backup_restore()
+        pause()
+        return
+    if kind == "chunks":
+        run_chunk_store()
+        pause()
+        return
     
-    # Python's shutil.make_archive replaces 'tar' dependency
+    # Python's tarfile module replaces the 'tar' dependency
     if not check_dependency("mail"):
         print_info("This tool uses 'mail' (from mailutils) to send email.")
         return
@@ -591,6 +3381,11 @@ def run_tarball_mailer():
     src_dir_str = input("Enter the full path of the SOURCE directory to backup: ")
     dest_dir_str = input("Enter the full path of the DESTINATION directory for the backup: ")
     email_addr = input("Enter the email address for notification: ")
+    workers_str = input(f"Compression threads (default: {os.cpu_count() or 1}): ") or str(os.cpu_count() or 1)
+    block_str = input("Compression block size in MB (default: 1): ") or "1"
+    level_str = input("Compression level 1-9 (default: 6): ") or "6"
+    use_hash = input("Record content hashes in the manifest (slower, ignores touched-but-unchanged files)? "
+                     "(y/n, default: n): ").lower() == 'y'
 
     src_dir = Path(src_dir_str).expanduser()
     dest_dir = Path(dest_dir_str).expanduser()
@@ -603,6 +3398,17 @@ def run_tarball_mailer():
     if not email_regex.match(email_addr):
         print_error("Invalid email address format. Aborting.")
         return
+
+    try:
+        workers = max(1, int(workers_str))
+        block_size = max(64 << 10, int(float(block_str) * (1 << 20)))
+        level = int(level_str)
+    except ValueError:
+        print_error("Threads, block size and level must be numbers. Aborting.")
+        return
+    if not 1 <= level <= 9:
+        print_error("Compression level must be between 1 and 9. Aborting.")
+        return
     
     try:
         dest_dir.mkdir(parents=True, exist_ok=True)
@@ -613,21 +3419,40 @@ def run_tarball_mailer():
     # 4. Prepare for archive
     src_folder_name = src_dir.name
     datestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-    backup_basename = f"{src_folder_name}_{datestamp}"
-    # Path without extension, shutil.make_archive adds it
+    manifests = load_backup_manifests(dest_dir, src_dir)
+    base = None
+    if kind == "incremental" and manifests:
+        base = manifests[-1]
+    elif kind == "differential":
+        base = next((m for m in reversed(manifests) if m["kind"] == "full"), None)
+    if kind != "full" and base is None:
+        print_info(f"No earlier full backup of '{src_dir}' in '{dest_dir}'; making a full one.")
+        kind = "full"
+    suffix = {"full": "", "incremental": "_inc", "differential": "_diff"}[kind]
+    backup_basename = f"{src_folder_name}_{datestamp}{suffix}"
     full_backup_path_base = dest_dir / backup_basename 
     
-    print_info(f"Preparing to archive '{src_dir}'...")
+    print_info(f"Preparing to archive '{src_dir}' ({kind})...")
     print_info(f"Target file: {full_backup_path_base}.tar.gz")
+    manifest_path = Path(f"{full_backup_path_base}{BACKUP_MANIFEST_SUFFIX}")
     
     try:
         # 5. Execution (Create Archive)
-        archive_path = shutil.make_archive(
-            base_name=str(full_backup_path_base),
-            format="gztar",       # This creates a .tar.gz
-            root_dir=src_dir.parent, # The directory to 'cd' into
-            base_dir=src_folder_name # The folder to archive
-        )
+        files = scan_backup_source(src_dir, base["files"] if base else {}, use_hash)
+        changed, deleted = diff_backup_files(files, base["files"]) if base else (None, [])
+        if base:
+            print_info(f"{len(changed)} new or changed and {len(deleted)} deleted file(s) since '{base['name']}'.")
+        archive_path = Path(f"{full_backup_path_base}.tar.gz")
+        extra = {BACKUP_DELETIONS_MEMBER: json.dumps(deleted).encode()} if base else None
+        stats = create_parallel_targz(src_dir, archive_path, workers, block_size, level, changed, extra)
+        rate = stats["bytes_in"] / (1 << 20) / max(stats["seconds"], 1e-9)
+        print_info(f"Compressed {format_size(stats['bytes_in'])} to {format_size(stats['bytes_out'])} "
+                   f"in {stats['seconds']:.1f}s ({rate:.1f} MB/s with {workers} thread(s)).")
+        manifest = {"version": 1, "name": backup_basename, "kind": kind, "base": base["name"] if base else None,
+                    "source": str(src_dir.resolve()), "folder": src_folder_name,
+                    "created": datetime.now().isoformat(), "archive": archive_path.name,
+                    "files": files, "deleted": deleted}
+        write_file_atomic(manifest_path, json.dumps(manifest).encode())
         
         print_success("Backup archive created successfully!")
         print_separator()
@@ -653,64 +3478,908 @@ Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"""
     except Exception as e:
         print_error(f"Archive creation or mail sending FAILED: {e}")
         # Clean up the failed archive if it exists
-        failed_archive = Path(f"{full_backup_path_base}.tar.gz")
-        if failed_archive.exists():
-            failed_archive.unlink()
+        for failed in (Path(f"{full_backup_path_base}.tar.gz"), manifest_path):
+            if failed.exists():
+                failed.unlink()
         
     pause()
 
-# --- 10. Term/Phase Fetcher (grep wrapper) ---
-def run_term_fetcher():
-    print_header("Term/Phase Fetcher (grep)")
-    
-    if not check_dependency("grep"):
-        return
-    
-    search_term = input("Enter the word or phrase to search for: ")
-    search_dir_str = input("Enter directory to search in (default: current directory): ") or "."
-    case_insensitive = input("Make search case-insensitive? (y/n): ").lower()
+# --- 10. Term/Phase Fetcher (parallel search) ---
+SEARCH_IGNORE_FILES = (".gitignore", ".ignore")
+SEARCH_VCS_DIRS = frozenset({".git", ".hg", ".svn"})
+BINARY_SNIFF_BYTES = 8192  # A NUL byte in this much of a file marks it binary, as grep -I does
 
-    if not search_term:
-        print_error("No search term provided. Aborting.")
-        return
-    
-    search_dir = Path(search_dir_str).expanduser()
+class IgnoreRules:
+    """Patterns from one folder's ignore files, chained to the rules of the folders above.
 
-    if not search_dir.is_dir():
-        print_error(f"Directory '{search_dir}' does not exist. Aborting.")
-        return
-    
-    # 4. Build 'grep' command options
-    grep_cmd = ["grep", "-r", "-n", "-I", "--color=auto"]
-    
-    if case_insensitive == 'y':
-        grep_cmd.append("-i")
-        print_info("Running case-insensitive search...")
-    else:
-        print_info("Running case-sensitive search...")
+    Supports the everyday subset of .gitignore syntax: globs, '**' across folders,
+    '!' to re-include, a trailing '/' for folders only, a '/' in the pattern to
+    anchor it to the folder holding the ignore file, and backslash escapes for
+    literal characters.
+    """
 
-    grep_cmd.extend([search_term, str(search_dir)])
-    
-    print_info(f"Searching for '{YELLOW}{search_term}{NC}' in '{search_dir}'...")
-    print_separator()
-    
-    # 5. Execution
-    # We run 'grep' and let it print directly to the terminal.
-    # stderr=subprocess.DEVNULL suppresses permission denied errors.
-    result = subprocess.run(grep_cmd, stderr=subprocess.DEVNULL)
-    
-    exit_code = result.returncode
-    
-    print_separator()
-    
-    if exit_code == 0:
-        print_success("Search complete. Matches found.")
-    elif exit_code == 1:
-        print_info(f"Search complete. No matches found for '{search_term}'.")
-    else:
-        print_error("An error occurred during the search (e.g., permissions).")
+    def __init__(self, parent, base: str, patterns: list):
+        self.parent = parent
+        self.base = base
+        self.patterns = patterns  # (compiled glob, negate, dir_only, anchored)
 
-    pause()
+    @classmethod
+    def load(cls, parent, directory: str, base: str):
+        """Returns the rules for a folder, or the parent's rules if it has no ignore files."""
+        patterns = []
+        for name in SEARCH_IGNORE_FILES:
+            try:
+                with open(os.path.join(directory, name), encoding="utf-8", errors="replace") as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            for line in lines:
+                line = line.rstrip()
+                if not line or line.startswith("#"):
+                    continue
+                negate = line.startswith("!")
+                if negate:
+                    line = line[1:]
+                dir_only = line.endswith("/")
+                line = line.rstrip("/")
+                # A leading '**/' also contains a '/': it stays, and translates to "at any depth"
+                anchored = "/" in line
+                line = line.lstrip("/")
+                if line:
+                    patterns.append((cls.translate(line), negate, dir_only, anchored))
+        return cls(parent, base, patterns) if patterns else parent
+
+    @staticmethod
+    def translate(pattern: str):
+        """Compiles a gitignore glob into a regex matched against whole paths.
+
+        '*', '?' and '[...]' never match a '/', so 'docs/*.md' stays in docs/.
+        A '**' that fills a whole path component spans any number of folders,
+        and a backslash makes the next character literal.
+        """
+        out = []
+        i, n = 0, len(pattern)
+        while i < n:
+            c = pattern[i]
+            i += 1
+            if c == "\\":
+                out.append(re.escape(pattern[i] if i < n else c))
+                i += 1
+            elif c == "*":
+                if pattern.startswith("*", i) and (i == 1 or pattern[i - 2] == "/"):
+                    if i + 1 == n:
+                        out.append(".*")  # 'dir/**': everything inside
+                        i += 1
+                        continue
+                    if pattern.startswith("/", i + 1):
+                        out.append("(?:.*/)?")  # '**/': zero or more folders
+                        i += 2
+                        continue
+                while pattern.startswith("*", i):
+                    i += 1  # Any other run of stars is a single '*'
+                out.append("[^/]*")
+            elif c == "?":
+                out.append("[^/]")
+            elif c == "[":
+                j = i + (pattern[i:i + 1] in ("!", "^"))
+                j += pattern[j:j + 1] == "]"
+                while j < n and pattern[j] != "]":
+                    j += 2 if pattern[j] == "\\" else 1
+                if j >= n:
+                    out.append(re.escape(c))  # No closing ']': a literal '['
+                    continue
+                body = pattern[i:j]
+                i = j + 1
+                members = ["^"] if body[0] in "!^" else []
+                chars = iter(body[len(members):])
+                for ch in chars:
+                    if ch == "\\":
+                        members.append(re.escape(next(chars, ch)))
+                    else:
+                        members.append(ch if ch == "-" else re.escape(ch))
+                out.append("(?!/)[" + "".join(members) + "]")
+            else:
+                out.append(re.escape(c))
+        return re.compile("".join(out), re.DOTALL)
+
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        chain = []
+        node = self
+        while node is not None:
+            chain.append(node)
+            node = node.parent
+        result = False
+        # Outer folders first, so the last matching rule (the deepest, latest one) wins
+        for node in reversed(chain):
+            local = rel_path[len(node.base):]
+            name = local.rsplit("/", 1)[-1]
+            for glob, negate, dir_only, anchored in node.patterns:
+                if dir_only and not is_dir:
+                    continue
+                if glob.fullmatch(local if anchored else name):
+                    result = not negate
+        return result
+
+def iter_search_files(root: str, use_ignore: bool = True, on_error=None):
+    """Yields (path, size, mtime_ns) for every regular file under root.
+
+    Like grep -r, symlinks met on the way down are not followed. With use_ignore,
+    VCS folders and anything matched by an ignore file are left out. A folder
+    that cannot be listed is reported, or passed to on_error(path, exc) if given.
+    """
+    rules = IgnoreRules.load(None, root, "") if use_ignore else None
+    stack = [(root, "", rules)]
+    while stack:
+        current, rel, rules = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError as e:
+            if on_error:
+                on_error(current, e)
+            else:
+                print_error(f"Could not scan '{current}': {e}")
+            continue
+        subdirs = []
+        for entry in entries:
+            child_rel = rel + entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if use_ignore and (entry.name in SEARCH_VCS_DIRS or (rules and rules.ignored(child_rel, True))):
+                        continue
+                    subdirs.append(entry)
+                elif entry.is_file(follow_symlinks=False):
+                    if rules and rules.ignored(child_rel, False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    yield entry.path, st.st_size, st.st_mtime_ns
+            except OSError:
+                continue
+        for entry in reversed(subdirs):
+            child_rel = f"{rel}{entry.name}/"
+            child_rules = IgnoreRules.load(rules, entry.path, child_rel) if use_ignore else None
+            stack.append((entry.path, child_rel, child_rules))
+
+class RegexSearcher:
+    """Finds the lines matching one compiled byte regex, numbered as grep -n does."""
+
+    COUNT_SLICE = 1 << 20  # Bytes copied at a time when counting newlines between matches
+
+    def __init__(self, pattern: bytes, ignore_case: bool = False, limit: int = None):
+        self.regex = re.compile(pattern, re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+        self.limit = limit
+
+    def scan(self, data) -> list:
+        """Returns (line number, line bytes) for every matching line of a buffer.
+
+        As with grep, a match has to fit inside one line: patterns such as
+        \\s or [^x] that could run across a newline are re-checked within it.
+        """
+        matches = []
+        search = self.regex.search
+        end = len(data)
+        lineno, counted, pos = 1, 0, 0
+        while pos <= end:
+            m = search(data, pos)
+            if m is None:
+                break
+            start = data.rfind(b"\n", 0, m.start()) + 1
+            # Counted in bounded slices: slicing an mmap copies, and the gap can be the whole file
+            while counted < start:
+                step = min(start, counted + self.COUNT_SLICE)
+                lineno += data[counted:step].count(b"\n")
+                counted = step
+            stop = data.find(b"\n", m.start())
+            if stop < 0:
+                stop = end
+            if m.end() > stop and search(data, m.start(), stop) is None:
+                # The match ran across a newline and nothing fits inside this line: not a hit
+                pos = stop + 1
+                continue
+            matches.append((lineno, data[start:stop]))
+            if self.limit and len(matches) >= self.limit:
+                break
+            pos = stop + 1
+        return matches
+
+    def highlight(self, line: bytes, color: str) -> bytes:
+        return self.regex.sub(lambda m: color.encode() + m.group() + NC.encode(), line)
+
+def trie_regex(patterns: list) -> bytes:
+    """Builds one regex alternation from literal byte patterns, sharing common prefixes.
+
+    Factoring the prefixes into a trie means the regex engine reads each input
+    byte once per position however many patterns there are, instead of trying
+    every alternative from scratch.
+    """
+    trie = {}
+    for pattern in patterns:
+        node = trie
+        for byte in pattern:
+            node = node.setdefault(byte, {})
+        node[None] = {}
+
+    # Rendered children-first with an explicit stack: long patterns make deep tries
+    rendered = {}
+    stack = [(trie, False)]
+    while stack:
+        node, children_done = stack.pop()
+        children = sorted((k, v) for k, v in node.items() if k is not None)
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for _, child in children)
+            continue
+        alts = [re.escape(bytes([byte])) + rendered.pop(id(child)) for byte, child in children]
+        body = b""
+        if alts:
+            body = alts[0] if len(alts) == 1 else b"(?:" + b"|".join(alts) + b")"
+            if None in node:
+                # A whole pattern ends here; anything longer is optional
+                body = (b"(?:" + body + b")" if len(alts) == 1 and len(body) > 1 else body) + b"?"
+        rendered[id(node)] = body
+    return rendered[id(trie)]
+
+class AhoCorasick:
+    """Aho-Corasick automaton over byte patterns: one pass finds every occurrence of all of them."""
+
+    def __init__(self, patterns: list):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for byte in pattern:
+                nxt = self.goto[state].get(byte)
+                if nxt is None:
+                    nxt = self.goto[state][byte] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(index)
+        # Breadth-first, so every fail target is finished before it is used
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for byte, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and byte not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(byte, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def count(self, data: bytes) -> dict:
+        """Returns {pattern index: occurrences} for everything found in data."""
+        goto, fail, out = self.goto, self.fail, self.out
+        counts = {}
+        state = 0
+        for byte in data:
+            while state and byte not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(byte, 0)
+            for index in out[state]:
+                counts[index] = counts.get(index, 0) + 1
+        return counts
+
+class MultiPatternSearcher(RegexSearcher):
+    """Finds lines holding any of many literal patterns and says which ones.
+
+    The trie regex picks out the matching lines at regex-engine speed. Only
+    those lines are counted per pattern: with bytes.find for a handful of
+    patterns, and with the Aho-Corasick automaton once there are
+    AHO_CORASICK_MIN_PATTERNS or more, where one Python-level pass beats
+    that many C-level ones.
+    """
+
+    AHO_CORASICK_MIN_PATTERNS = 64
+
+    def __init__(self, patterns: list, ignore_case: bool = False, limit: int = None):
+        try:
+            super().__init__(trie_regex(patterns), ignore_case, limit)
+        except (RecursionError, re.error, OverflowError):
+            # Too deeply nested for the regex compiler: a flat alternation, longest first
+            super().__init__(b"|".join(re.escape(p) for p in sorted(patterns, key=len, reverse=True)),
+                             ignore_case, limit)
+        self.ignore_case = ignore_case
+        self.needles = [p.lower() for p in patterns] if ignore_case else list(patterns)
+        self.automaton = AhoCorasick(self.needles) if len(patterns) >= self.AHO_CORASICK_MIN_PATTERNS else None
+
+    def count(self, line: bytes) -> dict:
+        """Returns {pattern index: occurrences, overlapping ones included} for one line."""
+        if self.ignore_case:
+            line = line.lower()
+        if self.automaton:
+            return self.automaton.count(line)
+        counts = {}
+        for index, needle in enumerate(self.needles):
+            found = 0
+            i = line.find(needle)
+            while i >= 0:
+                found += 1
+                i = line.find(needle, i + 1)
+            if found:
+                counts[index] = found
+        return counts
+
+    def scan(self, data) -> list:
+        """Returns (line number, line bytes, {pattern index: occurrences}) per matching line."""
+        return [(lineno, line, self.count(line)) for lineno, line in super().scan(data)]
+
+def load_search_patterns(path: Path) -> list:
+    """Reads one literal pattern per line, dropping blanks and repeats but keeping order."""
+    with open(path, "rb") as f:
+        lines = (line.rstrip(b"\r\n") for line in f)
+        return list(dict.fromkeys(line for line in lines if line.strip()))
+
+def search_file(path: str, searcher) -> tuple:
+    """Runs a searcher over one memory-mapped file. Returns (matches, error)."""
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return [], None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm.find(b"\0", 0, BINARY_SNIFF_BYTES) >= 0:
+                    return [], None
+                return searcher.scan(mm), None
+    except (OSError, ValueError) as e:
+        return [], str(e)
+
+_SEARCHER = None
+
+def _init_search_worker(searcher):
+    global _SEARCHER
+    _SEARCHER = searcher
+
+def _search_batch(paths: list) -> list:
+    return [(path, *search_file(path, _SEARCHER)) for path in paths]
+
+def batch_search_files(files, max_files: int = 64, max_bytes: int = 8 << 20):
+    """Groups (path, size, ...) tuples into batches, so small files share one pool round trip."""
+    batch, size = [], 0
+    for path, file_size, *_ in files:
+        batch.append(path)
+        size += file_size
+        if len(batch) >= max_files or size >= max_bytes:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+def _pooled_search(batches, searcher, workers: int, ordered: bool):
+    if workers <= 1:
+        for batch in batches:
+            for path in batch:
+                yield (path, *search_file(path, searcher))
+        return
+    window = workers * 4  # Batches in flight; keeps the walk just ahead of the workers
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker, initargs=(searcher,))
+    try:
+        if ordered:
+            pending = deque()
+            for batch in batches:
+                pending.append(pool.submit(_search_batch, batch))
+                if len(pending) >= window:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            running = set()
+            for batch in batches:
+                running.add(pool.submit(_search_batch, batch))
+                if len(running) >= window:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            for future in as_completed(running):
+                yield from future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def parallel_search(files, searcher, workers: int = 1, ordered: bool = True, max_matches: int = None):
+    """Searches files on a process pool, yielding (path, matches, error) per file.
+
+    Ordered mode yields files in walk order; unordered mode yields them as the
+    workers finish. The walk and the pool stop once max_matches lines are out.
+    """
+    total = 0
+    results = _pooled_search(batch_search_files(files), searcher, workers, ordered)
+    try:
+        for path, matches, error in results:
+            if max_matches is not None and total + len(matches) >= max_matches:
+                yield path, matches[:max_matches - total], error
+                return
+            total += len(matches)
+            yield path, matches, error
+    finally:
+        results.close()
+
+TRIGRAM_CHUNK = 16 << 20
+
+def buffer_trigrams(buf: bytes) -> set:
+    """Returns every trigram of a buffer as a little-endian 24-bit int."""
+    if len(buf) < 3:
+        return set()
+    if np is not None:
+        a = np.frombuffer(buf, dtype=np.uint8).astype(np.uint32)
+        return set(np.unique(a[:-2] | a[1:-1] << 8 | a[2:] << 16).tolist())
+    # Without NumPy: read the buffer as 4-byte words at the four alignments, which
+    # turns the per-byte work into C-level set building; each distinct word then
+    # yields its two trigrams.
+    words = set()
+    for k in range(4):
+        n = (len(buf) - k) // 4 * 4
+        chunk = array("I")
+        chunk.frombytes(buf[k:k + n])
+        if sys.byteorder == "big":
+            chunk.byteswap()
+        words.update(chunk)
+    grams = {w & 0xFFFFFF for w in words}
+    grams.update(w >> 8 for w in words)
+    grams.add(int.from_bytes(buf[-3:], "little"))
+    return grams
+
+def file_trigrams(path: str) -> tuple:
+    """Returns (sorted array of lowercased trigrams, error) for one file.
+
+    Binary and empty files get no trigrams, since the search skips them anyway.
+    """
+    grams = set()
+    try:
+        with open(path, "rb") as f:
+            carry = b""
+            first = True
+            while True:
+                chunk = f.read(TRIGRAM_CHUNK)
+                if not chunk:
+                    break
+                if first and chunk.find(b"\0", 0, BINARY_SNIFF_BYTES) >= 0:
+                    return array("I"), None
+                first = False
+                buf = (carry + chunk).lower()
+                grams |= buffer_trigrams(buf)
+                carry = buf[-2:]
+    except OSError as e:
+        return None, str(e)
+    return array("I", sorted(grams)), None
+
+def _trigram_batch(paths: list) -> list:
+    return [(path, *file_trigrams(path)) for path in paths]
+
+def _literal_trigrams(run: bytes) -> list:
+    run = run.lower()
+    return [int.from_bytes(run[i:i + 3], "little") for i in range(len(run) - 2)]
+
+def _trigram_query(items):
+    parts = []
+    run = bytearray()
+    for op, av in items:
+        if op is sre_constants.LITERAL and av < 256:
+            run.append(av)
+            continue
+        if len(run) >= 3:
+            parts.extend(_literal_trigrams(bytes(run)))
+        run.clear()
+        sub = None
+        if op is sre_constants.SUBPATTERN:
+            sub = _trigram_query(av[-1])
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            sub = _trigram_query(av[2])
+        elif op is sre_constants.BRANCH:
+            branches = [_trigram_query(b) for b in av[1]]
+            sub = None if None in branches else ("or", branches)
+        if sub is not None:
+            parts.append(sub)
+    if len(run) >= 3:
+        parts.extend(_literal_trigrams(bytes(run)))
+    return ("and", parts) if parts else None
+
+def regex_trigram_query(pattern: bytes, flags: int = 0):
+    """Returns the trigrams any match of a byte regex must contain, or None if it needs none.
+
+    The result is a tree of ("and" | "or", [trigram or subtree]) tuples built
+    from the literal runs the regex cannot match without. Classes, optional
+    parts and anything else unusual simply contribute nothing. The parse tree
+    comes from the private regex parser; if that is missing or shaped
+    differently, the answer is None and every indexed file is a candidate.
+    """
+    if sre_parse is None:
+        return None
+    try:
+        return _trigram_query(sre_parse.parse(pattern, flags))
+    except (re.error, TypeError, ValueError, AttributeError, IndexError, RecursionError):
+        return None
+
+class TrigramIndex:
+    """SQLite posting lists mapping each lowercased trigram to the files containing it.
+
+    Files get ids that are never reused, and postings are sorted uint32 id arrays
+    stored per (trigram, segment). An update walks the tree, drops the rows of
+    changed and deleted files (their ids linger in old segments as tombstones that
+    queries ignore) and writes the new and changed files as fresh segments.
+    compact() folds all segments into one once they or the tombstones pile up.
+    """
+
+    SEGMENT_POSTINGS = 8_000_000
+    MAX_SEGMENTS = 8
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.db = None
+        try:
+            self.db = self._connect()
+        except sqlite3.DatabaseError:
+            self._reset()
+        self._cache = {}
+
+    def _connect(self):
+        db = sqlite3.connect(str(self.path), timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS files ("
+                   "id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT UNIQUE NOT NULL, "
+                   "size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL)")
+        db.execute("CREATE TABLE IF NOT EXISTS postings ("
+                   "trigram INTEGER NOT NULL, segment INTEGER NOT NULL, ids BLOB NOT NULL, "
+                   "PRIMARY KEY (trigram, segment)) WITHOUT ROWID")
+        db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        db.commit()
+        return db
+
+    def _reset(self):
+        if self.db:
+            self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.unlink(f"{self.path}{suffix}")
+            except OSError:
+                pass
+        print_info("Trigram index was unreadable and has been rebuilt.")
+        self.db = self._connect()
+
+    def _meta(self, key: str) -> int:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _write_segment(self, segment: int, postings: dict):
+        self.db.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                            ((gram, segment, ids.tobytes()) for gram, ids in postings.items()))
+
+    def update(self, root: str, use_ignore: bool, workers: int = 1) -> dict:
+        """Brings the index in line with the tree. Returns counts, timings and failures.
+
+        Files that could not be read are listed under "failed" as (path, size,
+        mtime_ns); they are not in the index, so callers search them directly.
+
+        Updates are serialized through a lock file, so two searches on the same
+        folder never write the same segment. Only a corrupt database is rebuilt;
+        a busy or conflicting one raises as usual.
+        """
+        lock_fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print_info("Waiting for another update of this index to finish...")
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                return self._update(root, use_ignore, workers)
+            except sqlite3.DatabaseError as e:
+                if isinstance(e, (sqlite3.OperationalError, sqlite3.IntegrityError)):
+                    raise
+                self._reset()
+                return self._update(root, use_ignore, workers)
+        finally:
+            os.close(lock_fd)
+
+    def _update(self, root: str, use_ignore: bool, workers: int) -> dict:
+        start = time.perf_counter()
+        self._cache.clear()
+        known = {path: (fid, size, mtime_ns)
+                 for fid, path, size, mtime_ns in self.db.execute("SELECT id, path, size, mtime_ns FROM files")}
+        todo, seen = [], set()
+        for path, size, mtime_ns in iter_search_files(root, use_ignore):
+            seen.add(path)
+            row = known.get(path)
+            if row is None or row[1] != size or row[2] != mtime_ns:
+                todo.append((path, size, mtime_ns))
+        stale = [(row[0],) for path, row in known.items() if path not in seen]
+        stale += [(known[path][0],) for path, _, _ in todo if path in known]
+        with self.db:
+            self.db.executemany("DELETE FROM files WHERE id = ?", stale)
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('dead', ?)", (self._meta("dead") + len(stale),))
+
+        sizes = {path: (size, mtime_ns) for path, size, mtime_ns in todo}
+        batches = batch_search_files(todo)
+        if workers > 1 and len(todo) > 1:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = (item for batch in pool.map(_trigram_batch, batches) for item in batch)
+        else:
+            pool = None
+            results = (item for batch in batches for item in _trigram_batch(batch))
+
+        added, failed = 0, []
+        segment = self.db.execute("SELECT COALESCE(MAX(segment), -1) + 1 FROM postings").fetchone()[0]
+        postings = defaultdict(lambda: array("I"))
+        pending = 0
+        try:
+            for path, grams, error in results:
+                size, mtime_ns = sizes[path]
+                if error:
+                    failed.append((path, size, mtime_ns))  # Left out; the next update tries it again
+                    continue
+                fid = self.db.execute("INSERT INTO files (path, size, mtime_ns) VALUES (?, ?, ?)",
+                                      (path, size, mtime_ns)).lastrowid
+                for gram in grams:
+                    postings[gram].append(fid)
+                pending += len(grams)
+                added += 1
+                if pending >= self.SEGMENT_POSTINGS:
+                    self._write_segment(segment, postings)
+                    self.db.commit()
+                    segment += 1
+                    postings.clear()
+                    pending = 0
+            self._write_segment(segment, postings)
+            self.db.commit()
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+        live = self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        segments = self.db.execute("SELECT COUNT(DISTINCT segment) FROM postings").fetchone()[0]
+        if segments > self.MAX_SEGMENTS or self._meta("dead") > live:
+            self.compact()
+        return {"files": live, "indexed": added, "dropped": len(stale), "failed": failed,
+                "seconds": time.perf_counter() - start, "bytes": self.size()}
+
+    def compact(self):
+        """Rewrites every posting list as a single segment without tombstoned ids."""
+        live = {fid for (fid,) in self.db.execute("SELECT id FROM files")}
+        with self.db:
+            self.db.execute("DROP TABLE IF EXISTS postings_new")
+            self.db.execute("CREATE TABLE postings_new ("
+                            "trigram INTEGER NOT NULL, segment INTEGER NOT NULL, ids BLOB NOT NULL, "
+                            "PRIMARY KEY (trigram, segment)) WITHOUT ROWID")
+            current, merged = None, array("I")
+            rows = self.db.execute("SELECT trigram, ids FROM postings ORDER BY trigram, segment")
+            for gram, blob in chain(rows, [(None, b"")]):
+                if gram != current:
+                    kept = array("I", [fid for fid in merged if fid in live])
+                    if kept:
+                        self.db.execute("INSERT INTO postings_new VALUES (?, 0, ?)", (current, kept.tobytes()))
+                    current, merged = gram, array("I")
+                merged.frombytes(blob)
+            self.db.execute("DROP TABLE postings")
+            self.db.execute("ALTER TABLE postings_new RENAME TO postings")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('dead', 0)")
+        self.db.execute("VACUUM")
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._cache.clear()
+
+    def _postings(self, gram: int) -> set:
+        ids = self._cache.get(gram)
+        if ids is None:
+            ids = set()
+            for (blob,) in self.db.execute("SELECT ids FROM postings WHERE trigram = ?", (gram,)):
+                found = array("I")
+                found.frombytes(blob)
+                ids.update(found)
+            self._cache[gram] = ids
+        return ids
+
+    def _evaluate(self, node):
+        if isinstance(node, int):
+            return self._postings(node)
+        kind, children = node
+        if kind == "and":
+            result = None
+            for child in children:
+                ids = self._evaluate(child)
+                if ids is None:
+                    continue
+                result = set(ids) if result is None else result & ids
+                if not result:
+                    break
+            return result
+        result = set()
+        for child in children:
+            ids = self._evaluate(child)
+            if ids is None:
+                return None
+            result |= ids
+        return result
+
+    def candidates(self, query) -> tuple:
+        """Returns ((path, size, mtime_ns) of the files that may match, files indexed)."""
+        ids = self._evaluate(query) if query is not None else None
+        rows = self.db.execute("SELECT id, path, size, mtime_ns FROM files").fetchall()
+        picked = sorted((path, size, mtime_ns) for fid, path, size, mtime_ns in rows if ids is None or fid in ids)
+        return picked, len(rows)
+
+    def size(self) -> int:
+        total = 0
+        for suffix in ("", "-wal"):
+            try:
+                total += os.path.getsize(f"{self.path}{suffix}")
+            except OSError:
+                pass
+        return total
+
+    def close(self):
+        self.db.close()
+
+def run_term_fetcher():
+    print_header("Term/Phase Fetcher")
+
+    search_term = input("Enter the word or phrase to search for (or @file for a list of patterns, one per line): ")
+    search_dir_str = input("Enter directory to search in (default: current directory): ") or "."
+    case_insensitive = input("Make search case-insensitive? (y/n): ").lower()
+    use_regex = input("Treat the term as a regular expression? (y/n, default: n): ").lower() == 'y'
+    use_ignore = input("Skip files listed in .gitignore/.ignore and VCS folders? (y/n, default: y): ").lower() != 'n'
+    max_str = input("Stop after how many matching lines? (blank for no limit): ")
+    ordered = input("Print results in file order? (y/n, default: y): ").lower() != 'n'
+    json_str = input("Write results as JSON lines to a file (path, blank to print them): ")
+    workers_str = input(f"Worker processes (default: {os.cpu_count() or 1}): ") or str(os.cpu_count() or 1)
+    use_index = input("Use the trigram index for this folder (built or updated first)? (y/n, default: n): ").lower() == 'y'
+
+    if not search_term:
+        print_error("No search term provided. Aborting.")
+        return
+    
+    search_dir = Path(search_dir_str).expanduser()
+
+    if not search_dir.is_dir():
+        print_error(f"Directory '{search_dir}' does not exist. Aborting.")
+        return
+
+    try:
+        max_matches = int(max_str) if max_str else None
+        workers = max(1, int(workers_str))
+        if max_matches is not None and max_matches < 1:
+            raise ValueError
+    except ValueError:
+        print_error("Match limit must be a positive whole number, and the worker count a whole number. Aborting.")
+        return
+
+    patterns = None
+    if search_term.startswith("@"):
+        try:
+            patterns = load_search_patterns(Path(search_term[1:]).expanduser())
+        except OSError as e:
+            print_error(f"Cannot read pattern file '{search_term[1:]}': {e}")
+            return
+        if not patterns:
+            print_error("The pattern file has no patterns. Aborting.")
+            return
+        if use_regex:
+            print_info("Pattern files are matched as literal text.")
+        searcher = MultiPatternSearcher(patterns, case_insensitive == 'y', max_matches)
+        pattern = searcher.regex.pattern
+        hit_lines = [0] * len(patterns)
+        hit_counts = [0] * len(patterns)
+        hit_files = [0] * len(patterns)
+    else:
+        pattern = search_term.encode() if use_regex else re.escape(search_term.encode())
+        try:
+            searcher = RegexSearcher(pattern, case_insensitive == 'y', max_matches)
+        except re.error as e:
+            print_error(f"Invalid regular expression: {e}")
+            return
+
+    json_out = None
+    if json_str:
+        try:
+            json_out = open(Path(json_str).expanduser(), "w", encoding="utf-8")
+        except OSError as e:
+            print_error(f"Cannot write '{json_str}': {e}")
+            return
+
+    if case_insensitive == 'y':
+        print_info("Running case-insensitive search...")
+    else:
+        print_info("Running case-sensitive search...")
+    if patterns:
+        print_info(f"Searching for {len(patterns)} patterns from '{search_term[1:]}' in '{search_dir}' "
+                   f"with {workers} process(es)...")
+    else:
+        print_info(f"Searching for '{YELLOW}{search_term}{NC}' in '{search_dir}' with {workers} process(es)...")
+    print_separator()
+
+    files = None
+    if use_index:
+        key = f"{search_dir.resolve()}|{int(use_ignore)}".encode()
+        index = TrigramIndex(get_cache_dir("search") / f"{hashlib.blake2b(key, digest_size=8).hexdigest()}.db")
+        try:
+            built = index.update(str(search_dir.resolve()), use_ignore, workers)
+            start = time.perf_counter()
+            files, total = index.candidates(regex_trigram_query(pattern, searcher.regex.flags))
+            # Unindexed files are searched anyway, so their read errors get reported below
+            files = sorted(files + built["failed"])
+            total += len(built["failed"])
+        except sqlite3.Error as e:
+            print_error(f"Trigram index unavailable ({e}). Aborting.")
+            if json_out:
+                json_out.close()
+            return
+        finally:
+            index.close()
+        # The index keys files by resolved path; print them relative to the folder as given
+        resolved = str(search_dir.resolve())
+        files = [(os.path.join(str(search_dir), os.path.relpath(path, resolved)), size, mtime_ns)
+                 for path, size, mtime_ns in files]
+        print_info(f"Index updated in {built['seconds']:.2f}s: {built['indexed']} file(s) (re)indexed, "
+                   f"{built['dropped']} dropped, {format_size(built['bytes'])} on disk.")
+        if built["failed"]:
+            print_error(f"{len(built['failed'])} file(s) could not be read for the index; they are searched directly.")
+        share = 100 * len(files) / total if total else 0
+        print_info(f"Index narrowed the search to {len(files)} of {total} file(s) ({share:.1f}%) "
+                   f"in {time.perf_counter() - start:.3f}s.")
+        print_separator()
+
+    color = sys.stdout.isatty()
+    lines = files_matched = errors = 0
+    start = time.perf_counter()
+    try:
+        if files is None:
+            files = iter_search_files(str(search_dir), use_ignore)
+        for path, matches, error in parallel_search(files, searcher, workers, ordered, max_matches):
+            if error:
+                errors += 1
+                continue
+            if not matches:
+                continue
+            files_matched += 1
+            lines += len(matches)
+            if patterns:
+                for index in {index for *_, hits in matches for index in hits}:
+                    hit_files[index] += 1
+            for lineno, line, *extra in matches:
+                if extra:
+                    for index, count in extra[0].items():
+                        hit_lines[index] += 1
+                        hit_counts[index] += count
+                if json_out:
+                    record = {"path": path, "line": lineno, "text": line.decode("utf-8", "replace").rstrip("\r")}
+                    if extra:
+                        record["patterns"] = [patterns[i].decode("utf-8", "replace") for i in sorted(extra[0])]
+                    json_out.write(json.dumps(record) + "\n")
+                elif color:
+                    text = searcher.highlight(line, RED).decode("utf-8", "replace").rstrip("\r")
+                    print(f"{CYAN}{path}{NC}:{GREEN}{lineno}{NC}:{text}")
+                else:
+                    print(f"{path}:{lineno}:{line.decode('utf-8', 'replace').rstrip(chr(13))}")
+    except KeyboardInterrupt:
+        print_info("Search interrupted.")
+    finally:
+        if json_out:
+            json_out.close()
+    elapsed = time.perf_counter() - start
+
+    print_separator()
+
+    if patterns and lines:
+        print(f"{CYAN}{'Pattern':<40} {'Lines':>10} {'Hits':>10} {'Files':>8}{NC}")
+        ranked = sorted((i for i in range(len(patterns)) if hit_counts[i]), key=lambda i: -hit_counts[i])
+        for i in ranked:
+            print(f"{patterns[i].decode('utf-8', 'replace')[:40]:<40} {hit_lines[i]:>10} {hit_counts[i]:>10} {hit_files[i]:>8}")
+        print_info(f"{len(ranked)} of {len(patterns)} patterns matched.")
+        print_separator()
+
+    if errors:
+        print_error(f"{errors} file(s) could not be read (e.g., permissions).")
+    if lines:
+        limit_note = " (match limit reached)" if max_matches is not None and lines >= max_matches else ""
+        print_success(f"Search complete. {lines} matching line(s) in {files_matched} file(s) "
+                      f"in {elapsed:.2f}s{limit_note}.")
+        if json_out:
+            print_info(f"Results written to '{json_str}'.")
+        if use_index and files:
+            print_info(f"Index hit rate: {files_matched} of {len(files)} candidate file(s) matched "
+                       f"({100 * files_matched / len(files):.1f}%).")
+    else:
+        print_info(f"Search complete. No matches found for '{search_term}'.")
+
+    pause()
 
 # --- 11. Network Diagnostic Tool ---
 def run_network_diagnostics():
@@ -821,62 +4490,1037 @@ def run_system_health():
     pause()
 
 # --- 13. Log File Analyzer ---
-def run_log_analyzer():
-    print_header("Log File Analyzer")
-    
-    if not all([check_dependency("grep"), check_dependency("tail")]):
+LOG_BLOCK_SIZE = 1 << 20
+
+def reverse_find_lines(fd: int, size: int, needle: bytes, block_size: int = LOG_BLOCK_SIZE):
+    """Yields (offset, line) for each line containing needle, last line first.
+
+    Reads fixed-size blocks backwards from size with pread, so finding the last
+    few matches of a huge log only touches its tail. Matching is ASCII
+    case-insensitive, like grep -i on plain ASCII keywords.
+    """
+    needle = needle.lower()
+    end = size
+    tail = b""  # The start of the line the previous (later) block ended in
+    while end > 0:
+        start = max(0, end - block_size)
+        buf = os.pread(fd, end - start, start) + tail
+        cut = 0
+        if start > 0:
+            cut = buf.find(b"\n") + 1
+            if cut == 0:
+                tail = buf  # No line break yet: one long line, keep reading back
+                end = start
+                continue
+        body = buf[cut:]
+        lowered = body.lower()
+        pos = len(body)
+        while True:
+            hit = lowered.rfind(needle, 0, pos)
+            if hit < 0:
+                break
+            line_start = lowered.rfind(b"\n", 0, hit) + 1
+            line_end = lowered.find(b"\n", hit)
+            if line_end < 0:
+                line_end = len(body)
+            yield start + cut + line_start, body[line_start:line_end]
+            pos = line_start
+        tail = buf[:cut]
+        end = start
+
+class LogCache:
+    """Base for small per-log JSON caches that are dropped when the log is replaced.
+
+    A saved cache is offered (as self.saved) only while the inode matches and
+    the first bytes of the log are unchanged; subclasses also check that the
+    log has not shrunk below what they cover.
+    """
+
+    KIND = "cache"
+    HEAD = 4096
+
+    def __init__(self, path: Path, fd: int):
+        self.fd = fd
+        st = os.fstat(fd)
+        self.size = st.st_size
+        key = hashlib.blake2b(str(path.resolve()).encode(), digest_size=8).hexdigest()
+        self.cache_path = get_cache_dir("logs") / f"{key}.{self.KIND}.json"
+        self.head = os.pread(fd, self.HEAD, 0)
+        self.identity = {"dev": st.st_dev, "ino": st.st_ino}
+        self.dirty = False
+        self.saved = None
+        try:
+            saved = json.loads(self.cache_path.read_text())
+            if (saved["dev"], saved["ino"]) == (st.st_dev, st.st_ino) and \
+                    self.head[:saved["head_len"]] == bytes.fromhex(saved["head"]):
+                self.saved = saved
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save(self, payload: dict):
+        if not self.dirty:
+            return
+        data = {**self.identity, "head": self.head.hex(), "head_len": len(self.head), **payload}
+        try:
+            write_file_atomic(self.cache_path, json.dumps(data).encode())
+        except OSError:
+            pass  # Only a cache
+
+class NewlineIndex(LogCache):
+    """Cached newline counts at fixed byte checkpoints of a log file.
+
+    Turning a byte offset into a line number then costs one count from the
+    nearest checkpoint. The cache is extended as the log grows and rebuilt when
+    the file is replaced or truncated (new inode, shrunk, or different head).
+    """
+
+    KIND = "lines"
+    STEP = 64 << 20
+
+    def __init__(self, path: Path, fd: int):
+        super().__init__(path, fd)
+        self.checkpoints = [0]  # Newlines before offset k * STEP
+        if self.saved and (len(self.saved["checkpoints"]) - 1) * self.STEP <= self.size:
+            self.checkpoints = self.saved["checkpoints"]
+
+    def _count(self, lo: int, hi: int) -> int:
+        count = 0
+        while lo < hi:
+            chunk = os.pread(self.fd, min(LOG_BLOCK_SIZE * 8, hi - lo), lo)
+            if not chunk:
+                break
+            count += chunk.count(b"\n")
+            lo += len(chunk)
+        return count
+
+    def line_number(self, offset: int) -> int:
+        """Returns the 1-based number of the line starting at offset."""
+        k = offset // self.STEP
+        while len(self.checkpoints) <= k:
+            last = len(self.checkpoints) - 1
+            self.checkpoints.append(self.checkpoints[last] + self._count(last * self.STEP, (last + 1) * self.STEP))
+            self.dirty = True
+        return self.checkpoints[k] + self._count(k * self.STEP, offset) + 1
+
+    def save(self):
+        self._save({"checkpoints": self.checkpoints})
+
+def iter_matching_lines(data: bytes, needle: bytes):
+    """Yields (offset, line) for the lines of data containing needle (ASCII case-insensitive), in order."""
+    needle = needle.lower()
+    lowered = data.lower()
+    pos = 0
+    while True:
+        hit = lowered.find(needle, pos)
+        if hit < 0:
+            return
+        start = lowered.rfind(b"\n", 0, hit) + 1
+        end = lowered.find(b"\n", hit)
+        if end < 0:
+            end = len(data)
+        yield start, data[start:end]
+        pos = end + 1
+
+def format_log_line(line: bytes, highlight, number: int = None) -> str:
+    text = highlight.sub(lambda m: f"{RED}{m.group()}{NC}", line.decode("utf-8", "replace").rstrip("\r"))
+    return f"{GREEN}{number}{NC}:{text}" if number is not None else text
+
+class MatchRate:
+    """Matches per second over a sliding window of one-second buckets."""
+
+    def __init__(self, window: int = 10):
+        self.window = window
+        self.buckets = deque()  # [second, count]
+        self.started = time.monotonic()
+
+    def add(self, count: int, now: float):
+        second = int(now)
+        if self.buckets and self.buckets[-1][0] == second:
+            self.buckets[-1][1] += count
+        else:
+            self.buckets.append([second, count])
+
+    def rate(self, now: float) -> float:
+        while self.buckets and self.buckets[0][0] <= now - self.window:
+            self.buckets.popleft()
+        span = min(self.window, max(1.0, now - self.started))
+        return sum(count for _, count in self.buckets) / span
+
+def follow_log(path: Path, keyword: str, alarm: float = None, window: int = 10,
+               poll_interval: float = 0.5, status_every: float = 5.0, read_size: int = 4 << 20):
+    """Prints new lines containing keyword as they are appended, until Ctrl+C.
+
+    Keeps one descriptor open and reads whole appended blocks at a time, so it
+    keeps up with fast-growing logs. A new inode at the path (rotation) is
+    picked up once the old file is drained, and a file that shrinks
+    (truncation) is read again from the start.
+    """
+    needle = keyword.encode()
+    highlight = re.compile(re.escape(keyword), re.IGNORECASE)
+    path_str = str(path)
+    try:
+        watcher = InotifyWatcher(str(path.parent), IN_MODIFY | IN_CREATE | IN_MOVED_TO)
+    except (OSError, AttributeError) as e:
+        watcher = None
+        print_info(f"inotify unavailable ({e}). Checking the log every {poll_interval:g}s instead.")
+
+    fd = os.open(path_str, os.O_RDONLY)
+    st = os.fstat(fd)
+    identity = (st.st_dev, st.st_ino)
+    pos = st.st_size
+    carry = b""
+    rate = MatchRate(window)
+    total = 0
+    alarmed = False
+    last_status = time.monotonic()
+    reported = 0
+    draining = False
+
+    def tick(now):
+        nonlocal alarmed, last_status, reported
+        current = rate.rate(now)
+        if alarm is not None:
+            if current >= alarm and not alarmed:
+                print_error(f"Burst alarm: {current:.1f} matches/s over the last {window}s (threshold {alarm:g}).")
+                alarmed = True
+            elif current < alarm and alarmed:
+                print_info(f"Burst over: {current:.1f} matches/s.")
+                alarmed = False
+        if now - last_status >= status_every and total != reported:
+            print_info(f"{current:.1f} matches/s over the last {window}s, {total} in total.")
+            last_status = now
+            reported = total
+
+    try:
+        while True:
+            chunk = os.pread(fd, read_size, pos)
+            if chunk:
+                pos += len(chunk)
+                data = carry + chunk
+                cut = data.rfind(b"\n") + 1
+                carry = data[cut:]  # An unfinished last line waits for its newline
+                lines = [format_log_line(line, highlight) for _, line in iter_matching_lines(data[:cut], needle)]
+                if lines:
+                    sys.stdout.write("\n".join(lines) + "\n")
+                    sys.stdout.flush()
+                    total += len(lines)
+                now = time.monotonic()
+                rate.add(len(lines), now)
+                tick(now)
+                continue
+
+            try:
+                st = os.stat(path_str)
+            except FileNotFoundError:
+                st = None  # Rotated away; the new file is not there yet
+            if st is not None and (st.st_dev, st.st_ino) != identity:
+                if not draining:
+                    draining = True  # Read the old file to its end once more before switching
+                    continue
+                draining = False
+                os.close(fd)
+                fd = os.open(path_str, os.O_RDONLY)
+                st = os.fstat(fd)
+                identity, pos, carry = (st.st_dev, st.st_ino), 0, b""
+                print_info("Log was rotated; following the new file.")
+                continue
+            if st is not None and st.st_size < pos:
+                pos, carry = 0, b""
+                print_info("Log was truncated; reading it again from the start.")
+                continue
+
+            tick(time.monotonic())
+            if watcher:
+                ready, _, _ = select.select([watcher], [], [], poll_interval)
+                if ready:
+                    watcher.read_events()
+            else:
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        os.close(fd)
+        if watcher:
+            watcher.close()
+    print_success(f"Stopped following. {total} matching lines seen.")
+
+LOG_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+def find_rotation_set(log_file: Path) -> list:
+    """Returns log_file followed by its rotated copies, newest first.
+
+    Numbered copies (syslog.1, syslog.2.gz, ...) come in number order, then
+    date-stamped ones (syslog-20251017.gz) from the latest date back.
+    """
+    rotated = re.compile(rf"^{re.escape(log_file.name)}[.-](\d+)(?:\.(?:gz|bz2|xz))?$")
+    found = []
+    for entry in iter_dir_files(str(log_file.parent)):
+        m = rotated.match(entry.name)
+        if m:
+            n = int(m.group(1))
+            found.append(((0, n) if n < 10000 else (1, -n), Path(entry.path)))
+    return [log_file] + [path for _, path in sorted(found)]
+
+def expand_log_glob(pattern: str) -> list:
+    """Returns the files matching a glob, newest (by mtime) first."""
+    files = []
+    for name in glob.glob(os.path.expanduser(pattern)):
+        try:
+            st = os.stat(name)
+        except OSError:
+            continue
+        if stat.S_ISREG(st.st_mode):
+            files.append((-st.st_mtime_ns, name))
+    return [Path(name) for _, name in sorted(files)]
+
+def tail_log_matches(path: str, keyword: str, limit: int, numbers: bool = False) -> list:
+    """Returns up to limit (line number or None, line) pairs for the last matches in one log, newest first.
+
+    Plain files are read backwards from the end. Compressed ones cannot be,
+    so they are streamed through their decompressor keeping only the last
+    limit matches.
+    """
+    needle = keyword.encode()
+    opener = LOG_OPENERS.get(Path(path).suffix)
+    if opener is None:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            found = list(islice(reverse_find_lines(fd, os.fstat(fd).st_size, needle), limit))
+            if not (numbers and found):
+                return [(None, line) for _, line in found]
+            index = NewlineIndex(Path(path), fd)
+            result = [(index.line_number(offset), line) for offset, line in found]
+            index.save()
+            return result
+        finally:
+            os.close(fd)
+
+    recent = deque(maxlen=limit)
+    lines_before = 0
+    carry = b""
+    with opener(path, "rb") as f:
+        while True:
+            chunk = f.read(LOG_BLOCK_SIZE * 4)
+            data = carry + chunk
+            cut = data.rfind(b"\n") + 1 if chunk else len(data)
+            block, carry = data[:cut], data[cut:]
+            counted = 0
+            for start, line in iter_matching_lines(block, needle):
+                if numbers:
+                    lines_before += block.count(b"\n", counted, start)
+                    counted = start
+                recent.append((lines_before + 1 if numbers else None, line))
+            if numbers:
+                lines_before += block.count(b"\n", counted)
+            if not chunk:
+                break
+    recent.reverse()
+    return list(recent)
+
+def search_log_set(paths: list, keyword: str, limit: int, numbers: bool = False, workers: int = 1):
+    """Yields (path, matches newest first) in rotation order until limit matches are found.
+
+    The newest file is searched first in this process; when it alone has
+    enough matches no other file is opened. Otherwise the older files go to a
+    process pool, at most `workers` ahead of the file being reported, and
+    anything not yet started is cancelled once the limit is reached.
+    """
+    if not paths:
         return
-    
-    log_file_str = input("Enter the full path to the log file (e.g., /var/log/syslog): ")
-    keyword = input("Enter search term (e.g., ERROR, Failed, WARNING): ")
-    line_count = input("How many recent lines to show? (default: 10): ") or "10"
+    first = tail_log_matches(str(paths[0]), keyword, limit, numbers)
+    yield paths[0], first
+    remaining = limit - len(first)
+    rest = iter(paths[1:])
+    if remaining <= 0:
+        return
+    if workers <= 1:
+        for path in rest:
+            found = tail_log_matches(str(path), keyword, remaining, numbers)
+            yield path, found
+            remaining -= len(found)
+            if remaining <= 0:
+                return
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = deque()
+        for path in islice(rest, workers):
+            pending.append((path, pool.submit(tail_log_matches, str(path), keyword, remaining, numbers)))
+        while pending:
+            path, future = pending.popleft()
+            found = future.result()[:remaining]
+            yield path, found
+            remaining -= len(found)
+            if remaining <= 0:
+                return
+            for path in islice(rest, 1):
+                pending.append((path, pool.submit(tail_log_matches, str(path), keyword, remaining, numbers)))
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+LOG_MONTHS = {m: i for i, m in enumerate(
+    (b"Jan", b"Feb", b"Mar", b"Apr", b"May", b"Jun", b"Jul", b"Aug", b"Sep", b"Oct", b"Nov", b"Dec"), 1)}
+LOG_TIMESTAMP_RE = re.compile(
+    rb"(?P<Y>\d{4})-(?P<m>\d\d)-(?P<d>\d\d)[T ](?P<H>\d\d):(?P<M>\d\d):(?P<S>\d\d)(?P<f>[.,]\d+)?"
+    rb"(?P<tz>Z|[+-]\d\d:?\d\d)?"                                                # ISO 8601
+    rb"|(?P<smon>[A-Z][a-z]{2}) +(?P<sd>\d{1,2}) (?P<sH>\d\d):(?P<sM>\d\d):(?P<sS>\d\d)"  # syslog
+    rb"|(?P<cd>\d\d)/(?P<cmon>[A-Z][a-z]{2})/(?P<cY>\d{4}):(?P<cH>\d\d):(?P<cM>\d\d):(?P<cS>\d\d)"
+    rb"(?: (?P<ctz>[+-]\d{4}))?")                                                # Apache/nginx
+LOG_TIMESTAMP_WINDOW = 64  # Timestamps are looked for this near the start of a line
 
-    log_file = Path(log_file_str).expanduser()
+class LogTimestampParser:
+    """Finds and parses the ISO 8601, syslog or Apache timestamp near the start of a log line.
+
+    Times without a zone are taken as local time, and syslog's missing year is
+    the current one unless that would put the line in the future. Results are
+    cached per second, since consecutive lines mostly share one.
+    """
+
+    def __init__(self, now: float = None):
+        self.now = now if now is not None else time.time()
+        self.year = datetime.fromtimestamp(self.now).year
+        self.cache = {}
+
+    def parse(self, line: bytes) -> tuple:
+        """Returns (epoch seconds or None, (start, end) of the timestamp)."""
+        m = LOG_TIMESTAMP_RE.search(line, 0, LOG_TIMESTAMP_WINDOW)
+        if m is None:
+            return None, (0, 0)
+        fraction = m.group("f")
+        key = m.group() if not fraction else m.group()[:m.start("f") - m.start()] + (m.group("tz") or b"")
+        epoch = self.cache.get(key)
+        if epoch is None:
+            epoch = self._convert(m)
+            if len(self.cache) > 4096:
+                self.cache.clear()
+            self.cache[key] = epoch
+        if epoch is not None and fraction:
+            epoch += float(b"0." + fraction[1:])
+        return epoch, m.span()
+
+    def _convert(self, m):
+        try:
+            if m.group("Y"):
+                fields = [int(m.group(k)) for k in ("Y", "m", "d", "H", "M", "S")]
+                tz = m.group("tz")
+            elif m.group("smon"):
+                month = LOG_MONTHS.get(m.group("smon"))
+                if month is None:
+                    return None
+                fields = [self.year, month] + [int(m.group(k)) for k in ("sd", "sH", "sM", "sS")]
+                tz = None
+            else:
+                month = LOG_MONTHS.get(m.group("cmon"))
+                if month is None:
+                    return None
+                fields = [int(m.group("cY")), month] + [int(m.group(k)) for k in ("cd", "cH", "cM", "cS")]
+                tz = m.group("ctz")
+            if tz is None:
+                epoch = time.mktime((*fields, 0, 0, -1))
+                if m.group("smon") and epoch > self.now + 86400:
+                    fields[0] -= 1  # A December line read in January
+                    epoch = time.mktime((*fields, 0, 0, -1))
+                return epoch
+            offset = 0
+            if tz != b"Z":
+                tz = tz.replace(b":", b"")
+                offset = (int(tz[1:3]) * 60 + int(tz[3:5])) * 60 * (-1 if tz[:1] == b"-" else 1)
+            return calendar.timegm((*fields, 0, 0, 0)) - offset
+        except (ValueError, OverflowError):
+            return None
 
-    if not log_file.is_file():
-        print_error(f"Log file not found: '{log_file}'. Aborting.")
+def iter_log_blocks(path: Path, block_size: int = LOG_BLOCK_SIZE * 4):
+    """Yields a log's contents as blocks of whole lines, decompressing .gz/.bz2/.xz on the fly."""
+    opener = LOG_OPENERS.get(path.suffix, open)
+    carry = b""
+    with opener(path, "rb") as f:
+        while True:
+            chunk = f.read(block_size)
+            if not chunk:
+                break
+            data = carry + chunk
+            cut = data.rfind(b"\n") + 1
+            if cut:
+                yield data[:cut]
+            carry = data[cut:]
+    if carry:
+        yield carry
+
+LOG_TOKEN_RE = re.compile(
+    r"(?P<IP>\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b)"
+    r"|(?P<HEX>\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"
+    r"|\b0x[0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*[a-fA-F])(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{6,}\b)"
+    r"|(?P<PATH>(?<![\w.])(?:~|\.{1,2})?/[\w.@%+~-]+(?:/[\w.@%+~-]*)*)"
+    r"|(?P<NUM>(?<![\w.])[-+]?\d+(?:\.\d+)?(?![\d.]))")
+
+def log_template(text: str) -> str:
+    """Masks the variable parts of a log message (IPs, hex IDs, paths, numbers)."""
+    return LOG_TOKEN_RE.sub(lambda m: f"<{m.lastgroup}>", text)
+
+class SpaceSaving:
+    """Space-saving heavy-hitters sketch: approximate top-K counts in fixed memory.
+
+    At most `capacity` keys are tracked. A new key arriving when full replaces
+    the key with the smallest count and inherits that count as its possible
+    over-estimate (error), so every true heavy hitter is guaranteed a slot.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries = {}  # key -> [count, error, first seen, last seen]
+        self.heap = []     # (count when pushed, key); stale entries are fixed up lazily
+
+    def add(self, key, when=None):
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry[0] += 1
+            if when is not None:
+                entry[2] = when if entry[2] is None else entry[2]
+                entry[3] = when
+            return
+        if len(self.entries) >= self.capacity:
+            while True:
+                count, victim = heapq.heappop(self.heap)
+                current = self.entries[victim][0]
+                if current == count:
+                    break
+                heapq.heappush(self.heap, (current, victim))
+            del self.entries[victim]
+            self.entries[key] = [count + 1, count, when, when]
+            heapq.heappush(self.heap, (count, key))
+        else:
+            self.entries[key] = [1, 0, when, when]
+            heapq.heappush(self.heap, (0, key))
+
+    def top(self, k: int) -> list:
+        """Returns [(key, count, error, first seen, last seen)] for the k largest counts."""
+        best = heapq.nlargest(k, self.entries.items(), key=lambda kv: kv[1][0])
+        return [(key, *entry) for key, entry in best]
+
+def summarize_log_matches(log_files: list, keyword: str, top_k: int = 20, capacity: int = 2000) -> dict:
+    """Streams every matching line once, oldest file first, into templates and a minute histogram."""
+    needle = keyword.encode()
+    parser = LogTimestampParser()
+    sketch = SpaceSaving(capacity)
+    minutes = defaultdict(int)
+    lines = 0
+    for path in reversed(log_files):
+        for block in iter_log_blocks(path):
+            for _, line in iter_matching_lines(block, needle):
+                epoch, (ts_start, ts_end) = parser.parse(line)
+                text = line[:ts_start] + line[ts_end:] if ts_end else line
+                sketch.add(log_template(text.decode("utf-8", "replace").strip()), epoch)
+                if epoch is not None:
+                    minutes[int(epoch // 60)] += 1
+                lines += 1
+    return {"lines": lines, "top": sketch.top(top_k), "minutes": minutes, "tracked": len(sketch.entries)}
+
+def print_minute_histogram(minutes: dict, width: int = 40, max_rows: int = 30):
+    """Prints matches per minute as a bar chart, merging minutes when the span is long."""
+    if not minutes:
         return
-    
-    if not keyword:
-        print_error("No search term provided. Aborting.")
+    first, last = min(minutes), max(minutes)
+    step = max(1, -(-(last - first + 1) // max_rows))
+    buckets = defaultdict(int)
+    for minute, count in minutes.items():
+        buckets[(minute - first) // step] += count
+    peak = max(buckets.values())
+    label = "minute" if step == 1 else f"{step} minutes"
+    print(f"{CYAN}Matches per {label}:{NC}")
+    for i in range((last - first) // step + 1):
+        count = buckets.get(i, 0)
+        when = datetime.fromtimestamp((first + i * step) * 60).strftime("%Y-%m-%d %H:%M")
+        print(f"{when}  {count:>8}  {GREEN}{'#' * round(width * count / peak)}{NC}")
+
+def run_log_summary(log_files: list, keyword: str):
+    top_str = input("How many top templates to show? (default: 20): ") or "20"
+    if not top_str.isdigit() or int(top_str) <= 0:
+        print_error("Invalid input. The count must be a positive number.")
         return
-    
+    top_k = int(top_str)
+
+    print_info(f"Clustering every line containing '{YELLOW}{keyword}{NC}' in {len(log_files)} file(s)...")
+    print_separator()
+    start = time.perf_counter()
+    try:
+        summary = summarize_log_matches(log_files, keyword, top_k, capacity=max(2000, top_k * 50))
+    except (OSError, EOFError, lzma.LZMAError) as e:
+        print_error(f"An error occurred during log analysis: {e}")
+        return
+    elapsed = time.perf_counter() - start
+    if not summary["lines"]:
+        print_info("Search complete. No matches found.")
+        return
+
+    def when(epoch):
+        return datetime.fromtimestamp(epoch).strftime("%m-%d %H:%M:%S") if epoch is not None else "-"
+
+    print(f"{CYAN}{'Count':>9} {'First seen':<14} {'Last seen':<14} Template{NC}")
+    for template, count, error, first, last in summary["top"]:
+        approx = "~" if error else " "
+        print(f"{approx}{count:>8} {when(first):<14} {when(last):<14} {template[:120]}")
+    print_separator()
+    print_minute_histogram(summary["minutes"])
+    print_separator()
+    print_info(f"{summary['lines']} matching lines, {summary['tracked']} templates tracked. "
+               "Counts marked ~ may be over-estimated by the sketch.")
+    print_success(f"Summary complete in {elapsed:.2f}s.")
+
+LOG_PROBE_SIZE = 64 << 10
+LOG_PROBE_LIMIT = 1 << 20  # Give up looking for a timestamp this far past a probe point
+
+def iter_log_times(fd: int, offset: int, size: int, parser: LogTimestampParser, limit: int = None):
+    """Yields (epoch, line start) for each timestamped line starting in [offset, offset + limit).
+
+    A start that lands mid-line skips to the next line first. The file is read
+    in LOG_PROBE_SIZE blocks, however many lines each one holds.
+    """
+    end = size if limit is None else min(size, offset + limit)
+    pos = offset
+    skip = offset > 0 and os.pread(fd, 1, offset - 1) != b"\n"  # Inside a line: skip its rest
+    while pos < end:
+        buf = os.pread(fd, LOG_PROBE_SIZE, pos)
+        if not buf:
+            return
+        i = 0
+        if skip:
+            nl = buf.find(b"\n")
+            if nl < 0:
+                pos += len(buf)
+                continue
+            i = nl + 1
+            skip = False
+        while pos + i < end:
+            nl = buf.find(b"\n", i)
+            if nl < 0 and len(buf) - i < LOG_TIMESTAMP_WINDOW and pos + len(buf) < size:
+                break  # The line's head runs past this block; re-read from its start
+            epoch, _ = parser.parse(buf[i:i + LOG_TIMESTAMP_WINDOW if nl < 0 else min(nl, i + LOG_TIMESTAMP_WINDOW)])
+            if epoch is not None:
+                yield epoch, pos + i
+            if nl < 0:
+                i, skip = len(buf), True  # A line longer than the block: skip to its end
+                break
+            i = nl + 1
+        pos += i
+
+def probe_log_time(fd: int, offset: int, size: int, parser: LogTimestampParser,
+                   limit: int = LOG_PROBE_LIMIT) -> tuple:
+    """Returns (epoch, line start) for the first timestamped line starting at or after offset.
+
+    Returns (None, size) when no timestamp turns up within limit bytes.
+    """
+    return next(iter_log_times(fd, offset, size, parser, limit), (None, size))
+
+class TimeIndex(LogCache):
+    """Sparse, persisted (byte offset, timestamp) points taken every STEP bytes of a log.
+
+    Built with one small probe per point, it narrows a time lookup to a
+    single STEP-sized stretch of the file before the binary search starts.
+    """
+
+    KIND = "times"
+    STEP = 64 << 20
+
+    def __init__(self, path: Path, fd: int, parser: LogTimestampParser):
+        super().__init__(path, fd)
+        self.parser = parser
+        self.points = []  # [line start, epoch or None] for the probe at k * STEP
+        if self.saved and self.saved.get("step") == self.STEP and \
+                (len(self.saved["points"]) - 1) * self.STEP < self.size:
+            self.points = self.saved["points"]
+        # Only probe points that are a full STEP behind the end: the tail is still growing
+        while len(self.points) * self.STEP + self.STEP <= self.size:
+            epoch, start = probe_log_time(self.fd, len(self.points) * self.STEP, self.size, self.parser)
+            self.points.append([start, epoch])
+            self.dirty = True
+
+    def bounds(self, target: float) -> tuple:
+        """Returns (lo, hi) offsets known to bracket the first line at or after target."""
+        lo, hi = 0, self.size
+        for start, epoch in self.points:
+            if epoch is None:
+                continue
+            if epoch < target:
+                lo = start
+            else:
+                hi = start
+                break
+        return lo, hi
+
+    def save(self):
+        self._save({"step": self.STEP, "points": self.points})
+
+def find_log_time(fd: int, size: int, target: float, parser: LogTimestampParser, index: TimeIndex = None) -> int:
+    """Binary-searches a time-ordered log for the start of the first line stamped at or after target."""
+    lo, hi = index.bounds(target) if index else (0, size)
+    # lo is always 0 or a line start stamped before target
+    while hi - lo > LOG_PROBE_SIZE:
+        mid = (lo + hi) // 2
+        # Look all the way to hi: a long stretch without timestamps says nothing about target
+        epoch, start = probe_log_time(fd, mid, size, parser, hi - mid)
+        if epoch is not None and epoch < target:
+            lo = start
+        else:
+            hi = mid
+    # Finish with a forward scan over buffered blocks, however far the next timestamp is
+    for epoch, start in iter_log_times(fd, lo, size, parser):
+        if epoch >= target:
+            return start
+    return size
+
+def scan_window_block(block: bytes, needle: bytes, parser: LogTimestampParser,
+                      start: float, end: float, inside: bool) -> tuple:
+    """Returns (matching lines, inside the window, past its end) for a block of whole lines."""
+    lines = block.split(b"\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    if not lines:
+        return [], inside, False
+    first, _ = parser.parse(lines[0])
+    last, _ = parser.parse(lines[-1])
+    if (inside or (first is not None and first >= start)) and last is not None and last <= end:
+        # The whole block is inside the window: match it in one pass
+        return [line for _, line in iter_matching_lines(block, needle)], True, False
+    found = []
+    needle = needle.lower()
+    for line in lines:
+        epoch, _ = parser.parse(line)
+        if epoch is not None:
+            if epoch > end:
+                return found, False, True
+            inside = epoch >= start
+        if inside and needle in line.lower():
+            found.append(line)
+    return found, inside, False
+
+def read_log_window(path: Path, keyword: str, start: float, end: float, use_index: bool, stats: dict):
+    """Yields the lines containing keyword stamped between start and end (inclusive).
+
+    Plain logs are binary-searched for start and read only up to the first
+    line past end. Compressed logs are streamed from the top, stopping at end.
+    Lines without a timestamp (stack traces, continuations) go with the line above.
+    """
+    needle = keyword.encode()
+    parser = LogTimestampParser()
+    stats.setdefault("read", 0)
+    stats.setdefault("size", 0)
+
+    if path.suffix in LOG_OPENERS:
+        stats["size"] += path.stat().st_size
+        inside = False
+        for block in iter_log_blocks(path):
+            stats["read"] += len(block)
+            found, inside, done = scan_window_block(block, needle, parser, start, end, inside)
+            yield from found
+            if done:
+                return
+        return
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        stats["size"] += size
+        index = TimeIndex(path, fd, parser) if use_index else None
+        if index:
+            index.save()
+        pos = find_log_time(fd, size, start, parser, index)
+        carry = b""
+        inside = True
+        while pos < size:
+            chunk = os.pread(fd, LOG_BLOCK_SIZE, pos)
+            if not chunk:
+                break
+            pos += len(chunk)
+            stats["read"] += len(chunk)
+            data = carry + chunk
+            cut = data.rfind(b"\n") + 1 if pos < size else len(data)
+            block, carry = data[:cut], data[cut:]
+            found, inside, done = scan_window_block(block, needle, parser, start, end, inside)
+            yield from found
+            if done:
+                return
+    finally:
+        os.close(fd)
+
+LOG_TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d")
+LOG_CLOCK_FORMATS = ("%H:%M:%S", "%H:%M")
+
+def parse_time_bound(text: str, after: datetime = None) -> datetime:
+    """Parses a date-time, or a bare clock time.
+
+    A bare time means its latest past occurrence, or for an end bound (after
+    given) the first occurrence not before after, so "23:50" to "00:10" spans midnight.
+    """
+    text = text.strip()
+    for fmt in LOG_TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    for fmt in LOG_CLOCK_FORMATS:
+        try:
+            clock = datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+        if after is not None:
+            moment = datetime.combine(after.date(), clock)
+            return moment if moment >= after else moment + timedelta(days=1)
+        now = datetime.now()
+        moment = datetime.combine(now.date(), clock)
+        return moment if moment <= now else moment - timedelta(days=1)
+    raise ValueError(f"Unrecognized time '{text}' (use YYYY-MM-DD HH:MM[:SS] or HH:MM[:SS])")
+
+def run_log_time_range(log_files: list, keyword: str):
+    start_str = input("From (YYYY-MM-DD HH:MM[:SS], or HH:MM for the latest such time): ")
+    end_str = input("To (same formats; default: now): ")
+    use_index = input("Keep a sparse time index for faster repeat queries? (y/n, default: y): ").lower() != 'n'
+
+    try:
+        start = parse_time_bound(start_str)
+        end = parse_time_bound(end_str, after=start) if end_str else datetime.now()
+    except ValueError as e:
+        print_error(str(e))
+        return
+    if end < start:
+        print_error("The end of the range is before its start.")
+        return
+    # The end bound covers its whole last minute/second/day: "to 02:25" includes 02:25:59
+    resolution = 0 if not end_str else 1 if end_str.count(":") >= 2 else 60 if ":" in end_str else 86400
+    end_ts = end.timestamp() + resolution - 1e-6 if resolution else end.timestamp()
+
+    print_info(f"Searching for '{YELLOW}{keyword}{NC}' between {start:%Y-%m-%d %H:%M:%S} and {end:%Y-%m-%d %H:%M:%S}...")
+    print_separator()
+    highlight = re.compile(re.escape(keyword), re.IGNORECASE)
+    stats = {}
+    shown = 0
+    began = time.perf_counter()
+    try:
+        for path in reversed(log_files):  # Oldest first, so output is chronological
+            for line in read_log_window(path, keyword, start.timestamp(), end_ts, use_index, stats):
+                text = format_log_line(line, highlight)
+                print(f"{CYAN}{path.name}{NC}:{text}" if len(log_files) > 1 else text)
+                shown += 1
+    except (OSError, EOFError, lzma.LZMAError) as e:
+        print_error(f"An error occurred during log analysis: {e}")
+        return
+    print_separator()
+    if not shown:
+        print_info("Search complete. No matches in that time range.")
+    else:
+        print_success(f"Search complete. {shown} matching lines in range.")
+    print_info(f"Read {format_size(stats['read'])} of {format_size(stats['size'])} "
+               f"in {time.perf_counter() - began:.2f}s.")
+
+def _epoch_before(block: bytes, pos: int, parser: LogTimestampParser, fallback: float, max_lines: int = 200) -> float:
+    """Returns the timestamp of the nearest stamped line ending before pos in block."""
+    end = pos - 1  # The newline that ends the line before pos
+    for _ in range(max_lines):
+        if end < 0:
+            break
+        start = block.rfind(b"\n", 0, end) + 1
+        epoch, _ = parser.parse(block[start:end])
+        if epoch is not None:
+            return epoch
+        end = start - 1
+    return fallback
+
+class LogReader(threading.Thread):
+    """Streams one log's matching lines as (timestamp, line) batches into a bounded queue.
+
+    A matching line without a timestamp of its own (a stack trace line, say)
+    takes the timestamp of the entry it belongs to.
+    """
+
+    BATCH = 512
+
+    def __init__(self, path: Path, keyword: str, depth: int = 16):
+        super().__init__(daemon=True)
+        self.path = path
+        self.needle = keyword.encode()
+        self.queue = queue.Queue(maxsize=depth)
+        self.stop = threading.Event()
+
+    def _put(self, item) -> bool:
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self):
+        parser = LogTimestampParser()
+        last = float("-inf")
+        batch = []
+        try:
+            for block in iter_log_blocks(self.path):
+                for start, line in iter_matching_lines(block, self.needle):
+                    epoch, _ = parser.parse(line)
+                    if epoch is None:
+                        epoch = _epoch_before(block, start, parser, last)
+                    batch.append((epoch, line))
+                last = _epoch_before(block, len(block) + (not block.endswith(b"\n")), parser, last)
+                if len(batch) >= self.BATCH:
+                    if not self._put(batch):
+                        return
+                    batch = []
+            if batch:
+                self._put(batch)
+        except (OSError, EOFError, lzma.LZMAError) as e:
+            self._put(e)
+        finally:
+            self._put(None)
+
+def merge_log_streams(paths: list, keyword: str):
+    """Yields (timestamp, path, line) for matching lines of all logs in timestamp order.
+
+    Each log has its own reader thread and a small bounded queue, so memory
+    stays proportional to the number of files and a slow (say, compressed)
+    file does not hold up reading the others.
+    """
+    readers = [LogReader(path, keyword) for path in paths]
+    for reader in readers:
+        reader.start()
+
+    def drain(reader):
+        while True:
+            item = reader.queue.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                print_error(f"Stopped reading '{reader.path}': {item}")
+                continue
+            for epoch, line in item:
+                yield epoch, reader.path, line
+
+    try:
+        yield from heapq.merge(*(drain(reader) for reader in readers), key=lambda item: item[0])
+    finally:
+        for reader in readers:
+            reader.stop.set()
+
+def run_log_merge(log_files: list, keyword: str):
+    print_info(f"Merging lines containing '{YELLOW}{keyword}{NC}' from {len(log_files)} file(s) by timestamp...")
+    print_separator()
+    highlight = re.compile(re.escape(keyword), re.IGNORECASE)
+    width = min(24, max(len(path.name) for path in log_files))
+    shown = 0
+    start = time.perf_counter()
+    try:
+        for _, path, line in merge_log_streams(log_files, keyword):
+            print(f"{CYAN}{path.name[:width]:<{width}}{NC} {format_log_line(line, highlight)}")
+            shown += 1
+    except KeyboardInterrupt:
+        print_info("Merge interrupted.")
+    print_separator()
+    if not shown:
+        print_info("Search complete. No matches found.")
+    else:
+        print_success(f"Merged {shown} matching lines from {len(log_files)} file(s) "
+                      f"in {time.perf_counter() - start:.2f}s.")
+
+def run_log_recent(log_files: list, keyword: str):
+    if len(log_files) == 1 and log_files[0].suffix not in LOG_OPENERS:
+        if input("Also search its rotated copies (name.1, name.2.gz, ...)? (y/n, default: n): ").lower() == 'y':
+            log_files = find_rotation_set(log_files[0])
+    line_count = input("How many recent lines to show? (default: 10): ") or "10"
+    show_numbers = input("Show line numbers? (counting is cached after the first run; y/n, default: n): ").lower() == 'y'
+    workers = 1
+    if len(log_files) > 1:
+        workers_str = input(f"Worker processes for older files (default: {os.cpu_count() or 1}): ") or str(os.cpu_count() or 1)
+        if not workers_str.isdigit() or int(workers_str) <= 0:
+            print_error("Invalid input. Workers must be a positive number.")
+            return
+        workers = int(workers_str)
+
     if not line_count.isdigit() or int(line_count) <= 0:
         print_error("Invalid input. Lines must be a positive number.")
         return
     
-    print_info(f"Searching '{log_file}' for the {line_count} most recent lines containing '{YELLOW}{keyword}{NC}'...")
+    source = f"'{log_files[0]}'" if len(log_files) == 1 else f"{len(log_files)} log files"
+    print_info(f"Searching {source} for the {line_count} most recent lines containing '{YELLOW}{keyword}{NC}'...")
     print_separator()
     
     try:
-        # 4. Execution
-        # We build a pipe: grep ... | tail ...
-        grep_cmd = ["grep", "-i", "-n", "--color=always", keyword, str(log_file)]
-        tail_cmd = ["tail", "-n", line_count]
-        
-        # Start the first process (grep)
-        ps1 = subprocess.Popen(grep_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-        
-        # Start the second process (tail), taking input from the first
-        # We must read the output as text (text=True)
-        ps2 = subprocess.Popen(tail_cmd, stdin=ps1.stdout, stdout=subprocess.PIPE, text=True)
-        
-        # Allow ps1 to receive a SIGPIPE if ps2 exits
-        ps1.stdout.close()
-        
-        # Get the final output from ps2
-        output, _ = ps2.communicate()
-        
+        matches = []
+        opened = 0
+        for path, found in search_log_set(log_files, keyword, int(line_count), show_numbers, workers):
+            opened += 1
+            matches.extend((path, number, line) for number, line in found)
+
         # 5. Report Results
-        if not output.strip():
+        if not matches:
             print_info("Search complete. No matches found.")
         else:
-            print(output)
+            highlight = re.compile(re.escape(keyword), re.IGNORECASE)
+            for path, number, line in reversed(matches):
+                text = format_log_line(line, highlight, number)
+                print(f"{CYAN}{path.name}{NC}:{text}" if len(log_files) > 1 else text)
             print_separator()
+            if 1 < len(log_files) and opened < len(log_files):
+                print_info(f"Searched {opened} of {len(log_files)} files; older ones were not needed.")
             print_success("Search complete. Showing most recent matches.")
             
     except Exception as e:
         print_error(f"An error occurred during log analysis: {e}")
+
+def run_log_follow(log_file: Path, keyword: str):
+    alarm_str = input("Raise an alarm above how many matches per second? (blank for none): ")
+    try:
+        alarm = float(alarm_str) if alarm_str else None
+    except ValueError:
+        print_error("The alarm threshold must be a number.")
+        return
+
+    print_info(f"Following '{log_file}' for lines containing '{YELLOW}{keyword}{NC}'. Press Ctrl+C to stop.")
+    print_separator()
+    try:
+        follow_log(log_file, keyword, alarm)
+    except OSError as e:
+        print_error(f"An error occurred while following the log: {e}")
+
+def run_log_analyzer():
+    print_header("Log File Analyzer")
+    
+    log_file_str = input("Enter the full path to the log file, a folder of logs, or a glob "
+                         "(e.g., /var/log/syslog, /var/log/app*.log*): ")
+    keyword = input("Enter search term (e.g., ERROR, Failed, WARNING): ")
+    mode = input("Show (r)ecent matches, (f)ollow the log as it grows, (s)ummarize matches by template, "
+                 "search a (t)ime range, or (m)erge several logs by time? (default: r): ").lower() or 'r'
+
+    log_path = Path(log_file_str).expanduser()
+    # An existing path is taken literally, even when its name holds '[' or '*'
+    if log_path.is_file():
+        log_files = [log_path]
+    elif log_path.is_dir() or re.search(r"[*?]|\[[^/]*\]", log_file_str):
+        pattern = os.path.join(glob.escape(str(log_path)), "*") if log_path.is_dir() else log_file_str
+        log_files = expand_log_glob(pattern)
+        if not log_files:
+            print_error(f"No log files match '{log_file_str}'. Aborting.")
+            return
+    else:
+        print_error(f"Log file not found: '{log_path}'. Aborting.")
+        return
+    
+    if not keyword:
+        print_error("No search term provided. Aborting.")
+        return
+
+    if mode == 'f':
+        if len(log_files) > 1 or log_files[0].suffix in LOG_OPENERS:
+            print_error("Follow mode needs a single uncompressed log file.")
+        else:
+            run_log_follow(log_files[0], keyword)
+    elif mode == 's':
+        run_log_summary(log_files, keyword)
+    elif mode == 't':
+        run_log_time_range(log_files, keyword)
+    elif mode == 'm':
+        run_log_merge(log_files, keyword)
+    else:
+        run_log_recent(log_files, keyword)
     
     pause()
 
@@ -916,6 +5560,7 @@ def show_main_menu():
     print("11. Network Diagnostic Tool")
     print("12. System Health Dashboard")
     print("13. Log File Analyzer")
+    print("14. Duplicate Finder")
     print("")
     print(f"{RED}q. Quit{NC}")
     print_separator()
@@ -938,6 +5583,7 @@ def main():
         "11": run_network_diagnostics,
         "12": run_system_health,
         "13": run_log_analyzer,
+        "14": run_duplicate_finder,
     }
 
     while True: